@@ -1,10 +1,31 @@
 from src.bot.bot_handler import *
 from src.db.db_setup import *
+from src.bot.user_interest_cache import UserInterestCache
+from src.db.db_notifications import DbNotificationListener
+from src.db.interest_catalog import InterestCatalog
+from src.llm.museum_description_generator import DESCRIPTION_PROMPT_VERSION
+from src.llm.museum_description_store import MuseumDescriptionStore
+from src.search.city_resolver import CityResolver
+from src.search.geo_index import GeoIndex
+from src.search.interest_matcher import InterestMatcher
+from src.search.museum_catalog import MuseumCatalog
 
 
 # Главная точка входа
 def main():
     init_db()
+    MuseumDescriptionStore.purge_stale(DESCRIPTION_PROMPT_VERSION)
+    InterestCatalog.load()
+    MuseumCatalog.load()
+    InterestMatcher.load()
+    CityResolver.load()
+    GeoIndex.load()
+    UserInterestCache.enable_cross_process_invalidation()
+    MuseumCatalog.enable_hot_reload()
+    InterestMatcher.enable_hot_reload()
+    CityResolver.enable_hot_reload()
+    GeoIndex.enable_hot_reload()
+    DbNotificationListener.start()
     BotHandler.initialize_bot()
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from src.bot.bot_db_connector import BotDbConnector
+from src.db.db_helper import POOL_SIZE, POOL_MAX_OVERFLOW
+
+# Максимальное число одновременных обращений к БД из обработчиков бота.
+# По умолчанию совпадает с максимальным числом соединений в пуле.
+DB_ASYNC_CONCURRENCY = int(os.getenv("DB_ASYNC_CONCURRENCY", POOL_SIZE + POOL_MAX_OVERFLOW))
+
+
+# Асинхронная обертка над BotDbConnector для обработчиков бота.
+# Синхронные запросы выполняются в отдельном пуле потоков, поэтому
+# медленный запрос не блокирует цикл событий python-telegram-bot.
+class AsyncBotDbConnector:
+    _executor = ThreadPoolExecutor(max_workers=DB_ASYNC_CONCURRENCY, thread_name_prefix="bot-db")
+
+    @staticmethod
+    async def _run(func, *args, **kwargs):
+        """
+        Выполняет синхронную функцию доступа к БД в пуле потоков.
+
+        :param func: Синхронная функция (метод BotDbConnector).
+        :return: Результат функции.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            AsyncBotDbConnector._executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    @staticmethod
+    async def add_user(tg_id: int):
+        """Добавление нового пользователя по Telegram ID"""
+        return await AsyncBotDbConnector._run(BotDbConnector.add_user, tg_id)
+
+    @staticmethod
+    async def get_interest_id(interest_name):
+        """Получение ID интереса по названию"""
+        return await AsyncBotDbConnector._run(BotDbConnector.get_interest_id, interest_name)
+
+    @staticmethod
+    async def mutate_interests(tg_id, add_ids=(), remove_ids=(), toggle_ids=()) -> List[str]:
+        """Изменение интересов пользователя одним запросом (см. BotDbConnector.mutate_interests)"""
+        return await AsyncBotDbConnector._run(BotDbConnector.mutate_interests, tg_id, add_ids, remove_ids, toggle_ids)
+
+    @staticmethod
+    async def add_interest(tg_id, interest_id) -> List[str]:
+        """Добавление интереса пользователю"""
+        return await AsyncBotDbConnector._run(BotDbConnector.add_interest, tg_id, interest_id)
+
+    @staticmethod
+    async def get_user_interests(tg_id) -> List[str]:
+        """Получение списка интересов пользователя"""
+        return await AsyncBotDbConnector._run(BotDbConnector.get_user_interests, tg_id)
+
+    @staticmethod
+    async def remove_interest(tg_id, interest_id) -> List[str]:
+        """Удаление интереса пользователя"""
+        return await AsyncBotDbConnector._run(BotDbConnector.remove_interest, tg_id, interest_id)
+
+    @staticmethod
+    async def toggle_interests(tg_id, interest_ids) -> List[str]:
+        """Переключение пачки интересов пользователя"""
+        return await AsyncBotDbConnector._run(BotDbConnector.toggle_interests, tg_id, interest_ids)
+
+    @staticmethod
+    async def find_interests(tg_id, interest_ids) -> bool:
+        """Поиск интересов у пользователя"""
+        return await AsyncBotDbConnector._run(BotDbConnector.find_interests, tg_id, interest_ids)
+
+    @staticmethod
+    async def filter_museums_by_city(city: str, limit: Optional[int] = None,
+                                     seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Фильтрация музеев по городу (см. BotDbConnector.filter_museums_by_city)"""
+        return await AsyncBotDbConnector._run(BotDbConnector.filter_museums_by_city, city, limit, seed)
+
+    @staticmethod
+    async def get_museum_interests(museum_id: int) -> List[str]:
+        """Список интересов, связанных с музеем"""
+        return await AsyncBotDbConnector._run(BotDbConnector.get_museum_interests, museum_id)
+
+    @staticmethod
+    async def get_interests_for_museums(museum_ids: List[int]) -> Dict[int, List[str]]:
+        """Интересы сразу для нескольких музеев (см. BotDbConnector.get_interests_for_museums)"""
+        return await AsyncBotDbConnector._run(BotDbConnector.get_interests_for_museums, museum_ids)
+
+    @staticmethod
+    async def match_museums_by_interests(museum_ids: List[int], interest_ids: List[int], limit: int = 10) -> List[Dict[str, Any]]:
+        """Подбор музеев по интересам на стороне БД (см. BotDbConnector.match_museums_by_interests)"""
+        return await AsyncBotDbConnector._run(BotDbConnector.match_museums_by_interests, museum_ids, interest_ids, limit)
+
+    @staticmethod
+    async def match_city_museums_by_interests(city: str, interest_ids: List[int], limit: int = 10) -> List[Dict[str, Any]]:
+        """Подбор музеев города по интересам на стороне БД (см. BotDbConnector.match_city_museums_by_interests)"""
+        return await AsyncBotDbConnector._run(BotDbConnector.match_city_museums_by_interests, city, interest_ids, limit)
+
+    @staticmethod
+    async def get_museums_by_ids(museum_ids: List[int]) -> List[Dict[str, Any]]:
+        """Данные музеев по списку ID (см. BotDbConnector.get_museums_by_ids)"""
+        return await AsyncBotDbConnector._run(BotDbConnector.get_museums_by_ids, museum_ids)
+
+    @staticmethod
+    async def filter_museums_by_interests(museums: List[Dict[str, Any]], user_interests: List[str]) -> List[Dict[str, Any]]:
+        """Фильтрация музеев по интересам пользователя (см. BotDbConnector.filter_museums_by_interests)"""
+        return await AsyncBotDbConnector._run(BotDbConnector.filter_museums_by_interests, museums, user_interests)
@@ -4,11 +4,16 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext, ConversationHandler
 
 from src.bot.bot_commands.constants import *
-from src.bot.bot_db_connector import BotDbConnector
-from src.interests import INTERESTS, flatten_interests
+from src.bot.async_bot_db_connector import AsyncBotDbConnector
+from src.db.interest_catalog import InterestCatalog
+from src.interests import INTERESTS
+from src.llm.bulk_interests_linker import LINKER_WAIT_TIMEOUT, BulkInterestLinker
 from src.llm.mistral_connector import MistralConnector
 from src.llm.museum_description_generator import MuseumDescriptionGenerator
-from src.llm.museum_interests_linker import MuseumInterestLinker
+from src.search.city_resolver import CityResolver
+from src.search.geo_index import GEO_SEARCH_RADIUS_KM, GeoIndex
+from src.search.interest_matcher import InterestMatcher
+from src.search.museum_catalog import MuseumCatalog
 from src.utils.logger import log
 
 
@@ -40,7 +45,7 @@ class CallbackHandler:
         ]
 
         # Получаем уже выбранные интересы пользователя
-        user_interests = BotDbConnector.get_user_interests(user_id)
+        user_interests = await AsyncBotDbConnector.get_user_interests(user_id)
 
         # Добавляем интересы
         for interest in INTERESTS[category]:
@@ -68,11 +73,11 @@ class CallbackHandler:
         )
 
 
-    # Обработчик для ввода города
+    # Обработчик для ввода города или отправленной геопозиции
     @staticmethod
     async def handle_location_input(update: Update, context: CallbackContext):
         user_id = update.effective_user.id
-        user_interests = BotDbConnector.get_user_interests(user_id)
+        user_interests = await AsyncBotDbConnector.get_user_interests(user_id)
         interests_list = ", ".join(user_interests)
         await update.message.reply_text(
             f"Отлично! Уже ищу музеи по вашим интересам:\n\n{interests_list}.\n\nЭто займет несколько минут..."
@@ -82,7 +87,7 @@ class CallbackHandler:
         user_id = update.effective_user.id
 
         # Получаем интересы пользователя
-        user_interests = BotDbConnector.get_user_interests(user_id)
+        user_interests = await AsyncBotDbConnector.get_user_interests(user_id)
         log(f"[handle_location_input] user_interests: {user_interests}")
 
         # Если интересов нет, сообщаем об ошибке
@@ -92,55 +97,91 @@ class CallbackHandler:
             )
             return ConversationHandler.END
 
-        # Фильтруем музеи по городу
-        museums = BotDbConnector.filter_museums_by_city(location, limit=30)
-        log(f"[handle_location_input] museums_by_city: {museums}")
+        point = update.message.location
+        if point is not None:
+            # Ближайшие к пользователю музеи (пространственный индекс в памяти)
+            nearest = GeoIndex.nearest(point.latitude, point.longitude, k=30)
+            log(f"[handle_location_input] nearest: {nearest}")
+            museums = MuseumCatalog.get_many([museum_id for museum_id, _ in nearest])
+            not_found_text = f"Рядом с вами (в радиусе {GEO_SEARCH_RADIUS_KM:g} км) музеи не найдены."
+        else:
+            # Распознаем город (сокращения, "г.", опечатки) и дальше работаем с его каноническим названием
+            city = CityResolver.resolve(location)
+            log(f"[handle_location_input] city: {location!r} -> {city}")
+            if city is not None:
+                location = city.name
+
+            # Фильтруем музеи по городу (из каталога в памяти)
+            museums = MuseumCatalog.filter_by_city(location, limit=30) if city is not None else []
+            not_found_text = f"По вашему запросу (город: {location}) ничего не найдено."
+        log(f"[handle_location_input] museums: {museums}")
 
         if not museums:
-            await update.message.reply_text(
-                f"По вашему запросу (город: {location}) ничего не найдено."
-            )
+            await update.message.reply_text(not_found_text)
             return ConversationHandler.END
 
-        # Получаем полный список интересов
-        all_interests = flatten_interests(INTERESTS)
-        log(f"[handle_location_input] all_interests: {all_interests}")
-
-        # Связываем музеи с интересами
-        mistral_connector = MistralConnector()
-        linker = MuseumInterestLinker(mistral_connector)
-
-        for museum in museums:
-            # Проверяем, есть ли уже привязанные интересы
-            museum_interests = BotDbConnector.get_museum_interests(museum['museum_id'])
-
-            if not museum_interests:
-                # Если интересов нет, связываем их с помощью Mistral
-                linked_interests = linker.link_museum_interests(museum, all_interests)
-                linker.save_linked_interests(museum['museum_id'], linked_interests)
+        # Получаем уже привязанные интересы всех музеев одним запросом
+        interests_by_museum = await AsyncBotDbConnector.get_interests_for_museums(
+            [museum['museum_id'] for museum in museums]
+        )
 
-        # Фильтруем музеи по интересам пользователя
-        filtered_museums = BotDbConnector.filter_museums_by_interests(museums, user_interests)
+        # Музеи без интересов связываются в фоне (обычно это заранее делает пакетная задача
+        # src/llm/bulk_interests_linker.py), поэтому поиск не ждет ответов Mistral
+        unlinked_ids = [museum['museum_id'] for museum in museums if not interests_by_museum.get(museum['museum_id'])]
+        if unlinked_ids:
+            log(f"[handle_location_input] музеи без интересов поставлены в очередь на связывание: {unlinked_ids}")
+            linking = BulkInterestLinker.schedule(unlinked_ids)
+            # Ни один музей еще не связан (например, сразу после развертывания) - без связывания
+            # подбирать не из чего, поэтому ждем его (задача продолжит работу и после таймаута)
+            if len(unlinked_ids) == len(museums):
+                try:
+                    await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(linking)), LINKER_WAIT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    await update.message.reply_text(
+                        "Каталог музеев для этого места еще готовится. Попробуйте повторить поиск через несколько минут."
+                    )
+                    return ConversationHandler.END
+
+        # Подбираем музеи по интересам пользователя (векторный подбор в памяти):
+        # рядом с пользователем - среди ближайших, иначе - среди всех музеев города
+        interest_ids = InterestCatalog.get_ids(user_interests)
+        if point is not None:
+            ranked_museums = InterestMatcher.rank_museums([m['museum_id'] for m in museums], interest_ids, k=10)
+        else:
+            ranked_museums = InterestMatcher.rank(location, interest_ids, k=10)
+        museum_details = MuseumCatalog.get_many([m['museum_id'] for m in ranked_museums])
+        details_by_id = {museum['museum_id']: museum for museum in museum_details}
+        filtered_museums = [
+            {**details_by_id[match['museum_id']], **match}
+            for match in ranked_museums if match['museum_id'] in details_by_id
+        ]
         log(f"[MuseumInterestLinker] filtered_museums {filtered_museums}")
 
-        # Генерируем описания с обоснованием
-        description_generator = MuseumDescriptionGenerator(mistral_connector)
-        descriptions = description_generator.generate_museum_descriptions(filtered_museums)
+        if not filtered_museums:
+            await update.message.reply_text(
+                "Музеи, подходящие вашим интересам, пока не найдены. Попробуйте выбрать другие интересы "
+                "или повторить поиск позже.\n\n/help - показать список команд"
+            )
+            return ConversationHandler.END
 
-        # Разделяем descriptions на отдельные описания музеев
-        museum_descriptions = descriptions.split("|||") if descriptions else []
+        # Генерируем описания с обоснованием и отправляем каждое, как только оно готово
+        description_generator = MuseumDescriptionGenerator(MistralConnector())
 
         log(f"[handle_location_input] Отправляем пользователю описания музеев")
         try:
-            # Отправляем пользователю описания музеев
             await update.message.reply_text(
                 f"Вот найденные музеи по вашему запросу:"
             )
-            for text in museum_descriptions:
-                await asyncio.sleep(1)
+            sent = 0
+            async for museum, text in description_generator.astream_museum_descriptions(filtered_museums):
                 await update.message.reply_text(
                     f"\n\n{text}"
                 )
+                sent += 1
+            if filtered_museums and not sent:
+                await update.message.reply_text(
+                    "Не удалось подготовить описания музеев. Попробуйте позже."
+                )
             await update.message.reply_text(
                 "/help - показать список команд"
             )
@@ -168,12 +209,12 @@ class CallbackHandler:
         user_id = query.from_user.id
 
         # Удаляем интерес
-        interest_id = BotDbConnector.get_interest_id(interest_name)
+        interest_id = InterestCatalog.get_id(interest_name)
         if interest_id is None:
             await query.answer(f"Интерес '{interest_name}' не найден.")
             return
 
-        BotDbConnector.remove_interest(user_id, interest_id)
+        await AsyncBotDbConnector.remove_interest(user_id, interest_id)
 
         # Показываем подтверждение
         await query.answer(f"Интерес '{interest_name}' больше не выбран.")
@@ -194,14 +235,14 @@ class CallbackHandler:
         interest_name = query.data.replace(CALLBACK_REMOVE, "")
         user_id = query.from_user.id
 
-        # Получаем ID интереса через функцию из bot_db_functions
-        interest_id = BotDbConnector.get_interest_id(interest_name)
+        # Получаем ID интереса из справочника интересов
+        interest_id = InterestCatalog.get_id(interest_name)
         if interest_id is None:
             await query.answer(f"Интерес '{interest_name}' не найден.")
             return
 
         # Удаляем интерес через функцию из bot_db_functions
-        BotDbConnector.remove_interest(user_id, interest_id)
+        await AsyncBotDbConnector.remove_interest(user_id, interest_id)
         await query.edit_message_text(f"Интерес '{interest_name}' успешно удален.")
 
 
@@ -213,12 +254,12 @@ class CallbackHandler:
         user_id = query.from_user.id
 
         # Добавляем интерес
-        interest_id = BotDbConnector.get_interest_id(interest)
+        interest_id = InterestCatalog.get_id(interest)
         if interest_id is None:
             await query.answer(f"Интерес '{interest}' не найден.")
             return
 
-        BotDbConnector.add_interest(user_id, interest_id)
+        await AsyncBotDbConnector.add_interest(user_id, interest_id)
         await query.answer(f"Вы выбрали: {interest}")
 
         # Обновляем список интересов с текущей категорией
@@ -2,7 +2,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ConversationHandler, CallbackContext
 
 from src.bot.bot_commands.constants import *
-from src.bot.bot_db_connector import BotDbConnector
+from src.bot.async_bot_db_connector import AsyncBotDbConnector
 from src.interests import INTERESTS
 from src.utils.logger import log
 
@@ -16,7 +16,7 @@ class UserCommandHandler:
     @staticmethod
     async def start_command(update: Update, context: CallbackContext):
         user_id = update.effective_user.id
-        BotDbConnector.add_user(user_id)  # Сохраняем пользователя в БД
+        await AsyncBotDbConnector.add_user(user_id)  # Сохраняем пользователя в БД
         await update.message.reply_text(START_TEXT)
         # Сразу показываем категории интересов
         await UserCommandHandler.show_categories(update, context)
@@ -49,7 +49,7 @@ class UserCommandHandler:
         user_id = update.effective_user.id
         log(f'[show_categories] user_id: {user_id}')
         if user_id:
-            interests = BotDbConnector.get_user_interests(user_id)
+            interests = await AsyncBotDbConnector.get_user_interests(user_id)
             if interests:
                 keyboard.append([InlineKeyboardButton("✅ Готово", callback_data=CALLBACK_MUSEUMS_FOR_ME)])
 
@@ -74,7 +74,7 @@ class UserCommandHandler:
         user_id = update.effective_user.id
 
         # Получаем интересы пользователя через функцию из bot_db_functions
-        interests = BotDbConnector.get_user_interests(user_id)
+        interests = await AsyncBotDbConnector.get_user_interests(user_id)
 
         if not interests:
             await update.message.reply_text("У вас пока нет сохраненных интересов.")
@@ -94,7 +94,7 @@ class UserCommandHandler:
     @staticmethod
     async def show_my_interests(update: Update, context: CallbackContext):
         user_id = update.effective_user.id
-        interests = BotDbConnector.get_user_interests(user_id)
+        interests = await AsyncBotDbConnector.get_user_interests(user_id)
 
         # Формируем текст сообщения
         message_text = (
@@ -115,10 +115,11 @@ class UserCommandHandler:
     @staticmethod
     async def museums_for_me(update: Update, context: CallbackContext):
         user_id = update.effective_user.id
-        interests = BotDbConnector.get_user_interests(user_id)
+        interests = await AsyncBotDbConnector.get_user_interests(user_id)
 
         # Если интересов нет, предлагаем выбрать их, иначе запрашиваем населенный пункт
-        text = "Пожалуйста, напишите название города, по которому осуществить поиск (города России, например: Москва):" \
+        text = "Пожалуйста, напишите название города, по которому осуществить поиск (города России, например: Москва), " \
+               "или отправьте свою геопозицию, чтобы найти музеи поблизости:" \
             if interests else \
             "У вас пока нет выбранных интересов. Пожалуйста, сначала выберите интересы "
         f"с помощью команды /{COMMAND_SELECT_INTERESTS}, чтобы я мог вам что-то порекомендовать."
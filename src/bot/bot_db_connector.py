@@ -1,8 +1,13 @@
 from typing import List, Dict, Any, Optional
 
+from sqlalchemy import text
+
+from src.bot.user_interest_cache import UserInterestCache
 from src.db.db_helper import DbHelper
+from src.db.interest_catalog import InterestCatalog
+from src.search.interest_matcher import InterestMatcher
+from src.search.museum_catalog import city_key
 from src.utils.logger import log
-import random
 
 
 # Класс для соединения бота с БД
@@ -26,54 +31,95 @@ class BotDbConnector:
 
     @staticmethod
     def get_interest_id(interest_name):
-        """Получение ID интереса по названию"""
-        db_helper = DbHelper()
-        try:
-            query = '''
-                SELECT interest_id FROM museum.interest WHERE interest_name = :interest_name
-            '''
-            df = db_helper.read_query(query, {"interest_name": interest_name})
-            return df['interest_id'].iloc[0] if not df.empty else None
-        except Exception as e:
-            log(f"Ошибка при получении id интереса: {e}")
-            raise
-        finally:
-            db_helper.close_connection()
+        """Получение ID интереса по названию (из справочника интересов в памяти)"""
+        return InterestCatalog.get_id(interest_name)
 
     @staticmethod
-    def add_interest(tg_id, interest_id):
-        """Добавление интереса пользователю"""
-        BotDbConnector.add_user(tg_id)  # Создаем пользователя, если его нет
+    def mutate_interests(tg_id, add_ids=(), remove_ids=(), toggle_ids=()) -> List[str]:
+        """
+        Изменяет интересы пользователя одним запросом: создает пользователя (если его нет),
+        добавляет, удаляет и переключает интересы и возвращает итоговый список интересов.
+        Если один и тот же интерес указан и для добавления, и для удаления, он удаляется.
+
+        :param tg_id: Telegram ID пользователя.
+        :param add_ids: ID интересов для добавления.
+        :param remove_ids: ID интересов для удаления.
+        :param toggle_ids: ID интересов для переключения (выбранные удаляются, невыбранные добавляются).
+        :return: Итоговый список названий интересов пользователя.
+        """
+        query = '''
+            WITH new_user AS (
+                INSERT INTO museum.telegram_user (tg_id) VALUES (:tg_id)
+                ON CONFLICT (tg_id) DO NOTHING
+            ),
+            current_interests AS (
+                SELECT interest_id FROM museum.user_interest WHERE tg_id = :tg_id
+            ),
+            to_remove AS (
+                SELECT unnest(CAST(:remove_ids AS bigint[])) AS interest_id
+                UNION
+                SELECT t.interest_id FROM unnest(CAST(:toggle_ids AS bigint[])) AS t(interest_id)
+                WHERE t.interest_id IN (SELECT interest_id FROM current_interests)
+            ),
+            to_add AS (
+                SELECT a.interest_id FROM unnest(CAST(:add_ids AS bigint[])) AS a(interest_id)
+                UNION
+                SELECT t.interest_id FROM unnest(CAST(:toggle_ids AS bigint[])) AS t(interest_id)
+                WHERE t.interest_id NOT IN (SELECT interest_id FROM current_interests)
+                EXCEPT
+                SELECT interest_id FROM to_remove
+            ),
+            removed AS (
+                DELETE FROM museum.user_interest
+                WHERE tg_id = :tg_id AND interest_id IN (SELECT interest_id FROM to_remove)
+            ),
+            added AS (
+                INSERT INTO museum.user_interest (tg_id, interest_id)
+                SELECT :tg_id, interest_id FROM to_add
+                ON CONFLICT (tg_id, interest_id) DO NOTHING
+            )
+            SELECT interest_id FROM current_interests
+            WHERE interest_id NOT IN (SELECT interest_id FROM to_remove)
+            UNION
+            SELECT interest_id FROM to_add
+            ORDER BY interest_id;
+        '''
+        params = {
+            "tg_id": tg_id,
+            "add_ids": [int(i) for i in add_ids],
+            "remove_ids": [int(i) for i in remove_ids],
+            "toggle_ids": [int(i) for i in toggle_ids],
+        }
         db_helper = DbHelper()
         try:
-            # Проверяем, существует ли связь пользователь-интерес
-            check_query = '''
-                SELECT 1 
-                FROM museum.user_interest 
-                WHERE tg_id = :tg_id AND interest_id = :interest_id;
-            '''
-            df = db_helper.read_query(check_query, {"tg_id": tg_id, "interest_id": int(interest_id)})
-            log(f"Связь юзер-интерес: {df}")
-            if not df.empty:
-                log(f"empty: {df}")
-                return  # Интерес уже добавлен
-
-            # Добавляем интерес, если его нет
-            insert_query = '''
-                INSERT INTO museum.user_interest (tg_id, interest_id) 
-                VALUES (:tg_id, :interest_id);
-            '''
-            db_helper.insert_data(insert_query, {"tg_id": tg_id, "interest_id": int(interest_id)})
-            log(f"Добавлен интерес: {interest_id} пользователю {tg_id}")
+            with db_helper.session() as connection:
+                interest_ids = connection.execute(text(query), params).scalars().all()
+            interests = InterestCatalog.get_names(interest_ids)
+            UserInterestCache.put(tg_id, interests)
+            return interests
         except Exception as e:
-            log(f"Ошибка при добавлении интереса: {e}")
+            UserInterestCache.invalidate(tg_id)
+            log(f"Ошибка при изменении интересов пользователя: {e}")
             raise
         finally:
             db_helper.close_connection()
 
+    @staticmethod
+    def add_interest(tg_id, interest_id) -> List[str]:
+        """Добавление интереса пользователю (возвращает итоговый список интересов)"""
+        interests = BotDbConnector.mutate_interests(tg_id, add_ids=[interest_id])
+        log(f"Добавлен интерес: {interest_id} пользователю {tg_id}")
+        return interests
+
     @staticmethod
     def get_user_interests(tg_id):
-        """Получение списка интересов пользователя"""
+        """Получение списка интересов пользователя (сначала из кэша)"""
+        cached_interests = UserInterestCache.get(tg_id)
+        if cached_interests is not None:
+            return cached_interests
+
+        # Поколение берется до чтения: если интересы изменятся во время чтения, список не попадет в кэш
+        generation = UserInterestCache.generation(tg_id)
         BotDbConnector.add_user(tg_id)  # Создаем пользователя, если его нет
         db_helper = DbHelper()
         try:
@@ -81,10 +127,12 @@ class BotDbConnector:
                 SELECT i.interest_name
                 FROM museum.user_interest ui
                 JOIN museum.interest i ON ui.interest_id = i.interest_id
-                WHERE ui.tg_id = :tg_id;
+                WHERE ui.tg_id = :tg_id
+                ORDER BY ui.interest_id;
             '''
-            df = db_helper.read_query(query, {"tg_id": tg_id})
-            return df['interest_name'].tolist() if not df.empty else []
+            interests = db_helper.fetch_column(query, {"tg_id": tg_id})
+            UserInterestCache.put(tg_id, interests, generation)
+            return interests
         except Exception as e:
             log(f"Ошибка при получении интересов пользователя: {e}")
             raise
@@ -92,28 +140,14 @@ class BotDbConnector:
             db_helper.close_connection()
 
     @staticmethod
-    def remove_interest(tg_id, interest_id):
-        """Удаление интереса пользователя"""
-        db_helper = DbHelper()
-        try:
-            # Проверяем, существует ли пользователь
-            check_user_query = '''
-                SELECT 1 
-                FROM museum.telegram_user
-                WHERE tg_id = :tg_id;
-            '''
-            user_exists = db_helper.read_query(check_user_query, {"tg_id": tg_id})
-            if user_exists.empty:
-                return  # Пользователя нет, ничего не делаем
+    def remove_interest(tg_id, interest_id) -> List[str]:
+        """Удаление интереса пользователя (возвращает итоговый список интересов)"""
+        return BotDbConnector.mutate_interests(tg_id, remove_ids=[interest_id])
 
-            # Удаляем связь пользователь-интерес
-            delete_query = '''
-                DELETE FROM museum.user_interest
-                WHERE tg_id = :tg_id AND interest_id = :interest_id;
-            '''
-            db_helper.execute_query(delete_query, {"tg_id": tg_id, "interest_id": int(interest_id)})
-        finally:
-            db_helper.close_connection()
+    @staticmethod
+    def toggle_interests(tg_id, interest_ids) -> List[str]:
+        """Переключение пачки интересов пользователя (возвращает итоговый список интересов)"""
+        return BotDbConnector.mutate_interests(tg_id, toggle_ids=interest_ids)
 
     @staticmethod
     def find_interests(tg_id, interest_ids):
@@ -129,43 +163,53 @@ class BotDbConnector:
                     AND interest_id IN :interest_ids
                 ) as has_interests
             '''
-            df = db_helper.read_query(query, {"tg_id": tg_id, "interest_ids": tuple(interest_ids)})
-            return bool(df.iloc[0]['has_interests'])
+            return bool(db_helper.fetch_scalar(query, {"tg_id": tg_id, "interest_ids": tuple(interest_ids)}))
         finally:
             db_helper.close_connection()
 
     @staticmethod
-    def filter_museums_by_city(city: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    def filter_museums_by_city(city: str, limit: Optional[int] = None,
+                               seed: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Фильтрует музеи по городу с возможностью ограничения количества результатов.
-        Если указан limit, выбираются случайные музеи без повторов.
+        Если указан limit, случайные музеи без повторов выбираются на стороне БД
+        и по сети передаются только выбранные строки.
 
         :param city: Город для фильтрации.
         :param limit: Опциональный параметр для ограничения количества результатов.
+        :param seed: Необязательное зерно выборки: при одинаковом зерне и неизменном каталоге
+                     выбираются одни и те же музеи.
         :return: Список музеев в указанном городе (случайно выбранных, если указан limit).
         """
         db_helper = DbHelper()
         try:
-            # Запрос всех музеев для указанного города
-            query = '''
-            SELECT museum_id, name, description, city, address
-            FROM museum.museum
-            WHERE LOWER(city) = LOWER(:city);
-            '''
-            params = {"city": city}
-            all_museums = db_helper.read_query(query, params).to_dict('records')
-
-            if not all_museums:
-                return []  # Возвращаем пустой список, если нет музеев в городе
-
-            if limit is not None and limit > 0:
-                # Выбираем случайные записи без повторов
-                if limit <= len(all_museums):
-                    return random.sample(all_museums, limit)
-                else:
-                    return all_museums  # Если запрошенный лимит больше, чем доступных записей, возвращаем все
+            if limit is None or limit <= 0:
+                # Запрос всех музеев для указанного города
+                query = '''
+                SELECT museum_id, name, description, city, address
+                FROM museum.museum
+                WHERE LOWER(city) = LOWER(:city);
+                '''
+                return db_helper.fetch_all(query, {"city": city}, as_dict=True)
 
-            return all_museums  # Если limit не указан, возвращаем все музеи
+            # Сначала выбираем только ID (узкая сортировка по индексу города), затем читаем выбранные строки
+            order_by = "random()" if seed is None else "md5(CAST(museum_id AS text) || :seed)"
+            query = f'''
+            WITH picked AS (
+                SELECT museum_id
+                FROM museum.museum
+                WHERE LOWER(city) = LOWER(:city)
+                ORDER BY {order_by}
+                LIMIT :limit
+            )
+            SELECT m.museum_id, m.name, m.description, m.city, m.address
+            FROM picked p
+            JOIN museum.museum m ON m.museum_id = p.museum_id;
+            '''
+            params = {"city": city, "limit": limit}
+            if seed is not None:
+                params["seed"] = str(seed)
+            return db_helper.fetch_all(query, params, as_dict=True)
         finally:
             db_helper.close_connection()
 
@@ -186,8 +230,147 @@ class BotDbConnector:
                 JOIN museum.interest i ON mi.interest_id = i.interest_id
                 WHERE mi.museum_id = :museum_id;
             '''
-            df = db_helper.read_query(query, {"museum_id": museum_id})
-            return df['interest_name'].tolist()
+            return db_helper.fetch_column(query, {"museum_id": museum_id})
+        finally:
+            db_helper.close_connection()
+
+
+    @staticmethod
+    def get_interests_for_museums(museum_ids: List[int]) -> Dict[int, List[str]]:
+        """
+        Возвращает интересы сразу для нескольких музеев одним запросом.
+
+        :param museum_ids: Список ID музеев.
+        :return: Словарь {ID музея: список интересов}; музеи без интересов получают пустой список.
+        """
+        interests_by_museum = {int(museum_id): [] for museum_id in museum_ids}
+        if not interests_by_museum:
+            return interests_by_museum
+
+        db_helper = DbHelper()
+        try:
+            query = '''
+                SELECT mi.museum_id, i.interest_name
+                FROM museum.museum_interest mi
+                JOIN museum.interest i ON mi.interest_id = i.interest_id
+                WHERE mi.museum_id = ANY(CAST(:museum_ids AS bigint[]))
+                ORDER BY mi.museum_id, i.interest_id;
+            '''
+            for museum_id, interest_name in db_helper.fetch_all(query, {"museum_ids": list(interests_by_museum)}):
+                interests_by_museum[museum_id].append(interest_name)
+            return interests_by_museum
+        finally:
+            db_helper.close_connection()
+
+
+    @staticmethod
+    def match_museums_by_interests(museum_ids: List[int], interest_ids: List[int], limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Подбирает музеи по интересам пользователя на стороне БД
+        (по массиву relative_interests, без обращения к таблице связей).
+
+        :param museum_ids: ID музеев-кандидатов.
+        :param interest_ids: ID интересов пользователя.
+        :param limit: Максимальное количество музеев в результате.
+        :return: Музеи с совпавшими интересами (matched_interest_ids, matched_interest_names, matched_interest_count),
+                 отсортированные по количеству совпадений и названию.
+        """
+        if not museum_ids or not interest_ids:
+            return []
+
+        db_helper = DbHelper()
+        try:
+            query = '''
+                SELECT m.museum_id, m.name, m.description, m.city, m.address,
+                       matched.matched_interest_ids,
+                       (SELECT string_agg(i.interest_name, ', ' ORDER BY i.interest_id)
+                        FROM museum.interest i
+                        WHERE i.interest_id = ANY(matched.matched_interest_ids)) AS matched_interest_names,
+                       cardinality(matched.matched_interest_ids) AS matched_interest_count
+                FROM museum.museum m
+                CROSS JOIN LATERAL (
+                    SELECT array_agg(interest_id ORDER BY interest_id) AS matched_interest_ids
+                    FROM unnest(m.relative_interests) AS interest_id
+                    WHERE interest_id = ANY(CAST(:interest_ids AS bigint[]))
+                ) matched
+                WHERE m.museum_id = ANY(CAST(:museum_ids AS bigint[]))
+                  AND m.relative_interests && CAST(:interest_ids AS bigint[])
+                ORDER BY matched_interest_count DESC, m.name
+                LIMIT :limit;
+            '''
+            params = {
+                "museum_ids": [int(i) for i in museum_ids],
+                "interest_ids": [int(i) for i in interest_ids],
+                "limit": limit,
+            }
+            return db_helper.fetch_all(query, params, as_dict=True)
+        finally:
+            db_helper.close_connection()
+
+
+    @staticmethod
+    def match_city_museums_by_interests(city: str, interest_ids: List[int], limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Подбирает музеи города по интересам пользователя одним запросом:
+        GIN-индекс по relative_interests отбирает музеи с пересекающимися интересами (&&),
+        сортировка - по числу совпавших интересов. Город сравнивается по нормализованному ключу
+        (как в MuseumCatalog), поэтому "СПб" и "г. Санкт-Петербург" находят одни и те же музеи.
+
+        :param city: Город.
+        :param interest_ids: ID интересов пользователя.
+        :param limit: Максимальное количество музеев в результате.
+        :return: Музеи в формате match_museums_by_interests.
+        """
+        if not interest_ids:
+            return []
+
+        db_helper = DbHelper()
+        try:
+            query = '''
+                SELECT m.museum_id, m.name, m.description, m.city, m.address,
+                       matched.matched_interest_ids,
+                       (SELECT string_agg(i.interest_name, ', ' ORDER BY i.interest_id)
+                        FROM museum.interest i
+                        WHERE i.interest_id = ANY(matched.matched_interest_ids)) AS matched_interest_names,
+                       cardinality(matched.matched_interest_ids) AS matched_interest_count
+                FROM museum.museum m
+                CROSS JOIN LATERAL (
+                    SELECT array_agg(interest_id ORDER BY interest_id) AS matched_interest_ids
+                    FROM unnest(m.relative_interests) AS interest_id
+                    WHERE interest_id = ANY(CAST(:interest_ids AS bigint[]))
+                ) matched
+                WHERE m.city_key = :city_key
+                  AND m.relative_interests && CAST(:interest_ids AS bigint[])
+                ORDER BY matched_interest_count DESC, m.name
+                LIMIT :limit;
+            '''
+            params = {"city_key": city_key(city), "interest_ids": [int(i) for i in interest_ids], "limit": limit}
+            return db_helper.fetch_all(query, params, as_dict=True)
+        finally:
+            db_helper.close_connection()
+
+
+    @staticmethod
+    def get_museums_by_ids(museum_ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Возвращает данные музеев по списку ID (в том же порядке).
+
+        :param museum_ids: Список ID музеев.
+        :return: Список музеев (отсутствующие в БД ID пропускаются).
+        """
+        if not museum_ids:
+            return []
+
+        db_helper = DbHelper()
+        try:
+            query = '''
+                SELECT museum_id, name, description, city, address
+                FROM museum.museum
+                WHERE museum_id = ANY(CAST(:museum_ids AS bigint[]));
+            '''
+            rows = db_helper.fetch_all(query, {"museum_ids": [int(i) for i in museum_ids]}, as_dict=True)
+            museums_by_id = {row['museum_id']: row for row in rows}
+            return [museums_by_id[int(i)] for i in museum_ids if int(i) in museums_by_id]
         finally:
             db_helper.close_connection()
 
@@ -195,23 +378,17 @@ class BotDbConnector:
     @staticmethod
     def filter_museums_by_interests(museums: List[Dict[str, Any]], user_interests: List[str]) -> List[Dict[str, Any]]:
         """
-        Фильтрует музеи по интересам пользователя.
+        Фильтрует музеи по интересам пользователя (векторный подбор по битовым маскам интересов).
 
-        :param museums: Список музеев.
+        :param museums: Список музеев (одного города).
         :param user_interests: Список интересов пользователя.
-        :return: Отфильтрованный и отсортированный список музеев.
-        """
-        filtered_museums = []
-        for museum in museums:
-            museum_interests = BotDbConnector.get_museum_interests(museum['museum_id'])
-            common_interests = set(museum_interests).intersection(set(user_interests))
-            if common_interests:
-                museum['matched_interest_names'] = ', '.join(common_interests)
-                museum['matched_interest_count'] = len(common_interests)
-                filtered_museums.append(museum)
-
-        # Сортируем музеи по количеству совпадений и названию
-        filtered_museums.sort(key=lambda x: (-x['matched_interest_count'], x['name']))
-
-        # Ограничиваем результат 10 музеями
-        return filtered_museums[:10]
+        :return: Отфильтрованный и отсортированный список музеев (не более 10).
+        """
+        if not museums:
+            return []
+
+        museums_by_id = {museum['museum_id']: museum for museum in museums}
+        ranked = InterestMatcher.rank(
+            museums[0]['city'], InterestCatalog.get_ids(user_interests), k=10, museum_ids=list(museums_by_id)
+        )
+        return [{**museums_by_id[match['museum_id']], **match} for match in ranked]
@@ -48,7 +48,9 @@ class BotHandler:
                 )
             ],
             states={
-                LOCATION_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, CallbackHandler.handle_location_input)],
+                LOCATION_INPUT: [MessageHandler(
+                    (filters.TEXT & ~filters.COMMAND) | filters.LOCATION, CallbackHandler.handle_location_input
+                )],
             },
             fallbacks=[CommandHandler("cancel", CallbackHandler.cancel_museum_search)],
         )
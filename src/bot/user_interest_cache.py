@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from src.db.db_notifications import DbNotificationListener
+from src.utils.logger import log
+
+# Настройки кэша интересов пользователей
+USER_INTEREST_CACHE_MAX_SIZE = int(os.getenv("USER_INTEREST_CACHE_MAX_SIZE", 10000))
+USER_INTEREST_CACHE_TTL = int(os.getenv("USER_INTEREST_CACHE_TTL", 600))
+
+# Канал NOTIFY, в который триггер museum.user_interest пишет tg_id измененного пользователя
+USER_INTEREST_CHANNEL = "museum_user_interest"
+
+
+# Кэш интересов пользователей процесса (LRU + TTL).
+# Обновляется сквозной записью при добавлении/удалении интересов и
+# инвалидируется по уведомлениям PostgreSQL об изменениях из других процессов.
+# Каждая запись и инвалидация увеличивает поколение пользователя: список, прочитанный из БД,
+# кладется в кэш, только если поколение не изменилось за время чтения (иначе он мог устареть).
+class UserInterestCache:
+    _entries: "OrderedDict[int, tuple]" = OrderedDict()
+    _generations: Dict[int, int] = {}
+    # Поколение всего кэша (увеличивается при полной очистке)
+    _epoch = 0
+    _lock = threading.Lock()
+    _stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def get(tg_id: int) -> Optional[List[str]]:
+        """
+        Возвращает интересы пользователя из кэша.
+
+        :param tg_id: Telegram ID пользователя.
+        :return: Список названий интересов или None, если записи нет (или она устарела).
+        """
+        with UserInterestCache._lock:
+            entry = UserInterestCache._entries.get(tg_id)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del UserInterestCache._entries[tg_id]
+                UserInterestCache._stats["misses"] += 1
+                return None
+            UserInterestCache._entries.move_to_end(tg_id)
+            UserInterestCache._stats["hits"] += 1
+            return list(entry[0])
+
+    @staticmethod
+    def _bump(tg_id: int):
+        """Увеличивает поколение пользователя (вызывается под блокировкой)."""
+        if len(UserInterestCache._generations) >= 2 * USER_INTEREST_CACHE_MAX_SIZE:
+            # Счетчики не копятся бесконечно: сбрасываем их вместе со сменой поколения кэша
+            UserInterestCache._generations.clear()
+            UserInterestCache._epoch += 1
+        UserInterestCache._generations[tg_id] = UserInterestCache._generations.get(tg_id, 0) + 1
+
+    @staticmethod
+    def generation(tg_id: int) -> Tuple[int, int]:
+        """
+        Текущее поколение записи пользователя. Берется до чтения интересов из БД и передается в put.
+
+        :param tg_id: Telegram ID пользователя.
+        :return: Поколение кэша и поколение пользователя.
+        """
+        with UserInterestCache._lock:
+            return UserInterestCache._epoch, UserInterestCache._generations.get(tg_id, 0)
+
+    @staticmethod
+    def put(tg_id: int, interests: List[str], generation: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        Сохраняет интересы пользователя в кэш (с вытеснением самых давних записей).
+
+        :param tg_id: Telegram ID пользователя.
+        :param interests: Список названий интересов.
+        :param generation: Поколение, взятое до чтения интересов из БД (см. generation). Если с тех пор
+                           интересы изменялись или инвалидировались, список не сохраняется. Если не указано,
+                           список считается актуальным (сквозная запись) и поколение увеличивается.
+        :return: Сохранен ли список.
+        """
+        with UserInterestCache._lock:
+            if generation is None:
+                UserInterestCache._bump(tg_id)
+            elif generation != (UserInterestCache._epoch, UserInterestCache._generations.get(tg_id, 0)):
+                return False
+            UserInterestCache._entries[tg_id] = (tuple(interests), time.monotonic() + USER_INTEREST_CACHE_TTL)
+            UserInterestCache._entries.move_to_end(tg_id)
+            while len(UserInterestCache._entries) > USER_INTEREST_CACHE_MAX_SIZE:
+                UserInterestCache._entries.popitem(last=False)
+                UserInterestCache._stats["evictions"] += 1
+            return True
+
+    @staticmethod
+    def add(tg_id: int, interest_name: str):
+        """Сквозная запись: добавляет интерес в кэшированный список пользователя (если он закэширован)."""
+        with UserInterestCache._lock:
+            UserInterestCache._bump(tg_id)
+            entry = UserInterestCache._entries.get(tg_id)
+            if entry is not None and interest_name not in entry[0]:
+                UserInterestCache._entries[tg_id] = (entry[0] + (interest_name,), entry[1])
+
+    @staticmethod
+    def remove(tg_id: int, interest_name: str):
+        """Сквозная запись: удаляет интерес из кэшированного списка пользователя (если он закэширован)."""
+        with UserInterestCache._lock:
+            UserInterestCache._bump(tg_id)
+            entry = UserInterestCache._entries.get(tg_id)
+            if entry is not None and interest_name in entry[0]:
+                interests = tuple(name for name in entry[0] if name != interest_name)
+                UserInterestCache._entries[tg_id] = (interests, entry[1])
+
+    @staticmethod
+    def invalidate(tg_id: Optional[int] = None):
+        """
+        Удаляет запись пользователя из кэша.
+
+        :param tg_id: Telegram ID пользователя; если None - очищается весь кэш.
+        """
+        with UserInterestCache._lock:
+            if tg_id is None:
+                UserInterestCache._entries.clear()
+                UserInterestCache._generations.clear()
+                UserInterestCache._epoch += 1
+            else:
+                UserInterestCache._entries.pop(tg_id, None)
+                UserInterestCache._bump(tg_id)
+            UserInterestCache._stats["invalidations"] += 1
+
+    @staticmethod
+    def stats() -> dict:
+        """Возвращает статистику кэша."""
+        with UserInterestCache._lock:
+            return dict(UserInterestCache._stats, size=len(UserInterestCache._entries))
+
+    @staticmethod
+    def _on_notification(payload: Optional[str]):
+        """Обработчик уведомления об изменении интересов в другом процессе."""
+        if payload is None:
+            UserInterestCache.invalidate()
+            return
+        try:
+            UserInterestCache.invalidate(int(payload))
+        except ValueError:
+            log(f"[UserInterestCache] некорректное уведомление: {payload}")
+            UserInterestCache.invalidate()
+
+    @staticmethod
+    def enable_cross_process_invalidation():
+        """Подписывает кэш на уведомления об изменениях интересов (до запуска DbNotificationListener)."""
+        DbNotificationListener.subscribe(USER_INTEREST_CHANNEL, UserInterestCache._on_notification)
@@ -1,33 +1,206 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
+from contextlib import contextmanager
+from itertools import islice
+from typing import Dict, Any, List, Optional, Iterable, Sequence
+import io
 import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import SQLAlchemyError
 
 from src.utils.logger import log
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    """Читает булеву переменную окружения (1/true/yes/on)."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Настройки пула соединений (переопределяются переменными окружения)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+
+# Размер пачки строк при массовой загрузке
+BULK_BATCH_SIZE = int(os.getenv("DB_BULK_BATCH_SIZE", 10000))
+
+
+def _copy_csv_value(value) -> str:
+    """Кодирует значение для COPY ... (FORMAT csv): None -> NULL, строки в кавычках."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
 # Класс для работы с базой данных
 class DbHelper:
+    # Общий для всего процесса движок с пулом соединений
+    _engine = None
+    _engine_lock = threading.Lock()
+    # Счетчики событий пула
+    _pool_counters = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+    # PID серверных процессов PostgreSQL, обслуживающих соединения пула
+    _backend_pids = set()
+
     def __init__(self):
         self.engine = self._connect_to_db()
 
 
     # Подключение к базе данных
     def _connect_to_db(self): # noqa
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise EnvironmentError("Переменная окружения DATABASE_URL не установлена.")
-        try:
-            engine = create_engine(database_url)
-            return engine
-        except Exception as e:
-            log(f"Ошибка подключения к базе данных: {e}")
-            raise
+        return DbHelper.get_engine()
+
+
+    @classmethod
+    def get_engine(cls):
+        """
+        Возвращает общий движок процесса, создавая его при первом обращении.
+
+        :return: Движок SQLAlchemy с пулом соединений.
+        """
+        if cls._engine is not None:
+            return cls._engine
+
+        with cls._engine_lock:
+            if cls._engine is None:
+                database_url = os.getenv("DATABASE_URL")
+                if not database_url:
+                    raise EnvironmentError("Переменная окружения DATABASE_URL не установлена.")
+                try:
+                    engine = create_engine(
+                        database_url,
+                        pool_size=POOL_SIZE,
+                        max_overflow=POOL_MAX_OVERFLOW,
+                        pool_timeout=POOL_TIMEOUT,
+                        pool_recycle=POOL_RECYCLE,
+                        pool_pre_ping=POOL_PRE_PING,
+                    )
+                except Exception as e:
+                    log(f"Ошибка подключения к базе данных: {e}")
+                    raise
+                cls._register_pool_events(engine)
+                cls._engine = engine
+                log(f"[DbHelper] создан пул соединений: size={POOL_SIZE}, overflow={POOL_MAX_OVERFLOW}, "
+                    f"pre_ping={POOL_PRE_PING}, recycle={POOL_RECYCLE}")
+        return cls._engine
+
+
+    @classmethod
+    def _register_pool_events(cls, engine):
+        """Подписывается на события пула для сбора статистики."""
+        counters = cls._pool_counters
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record): # noqa
+            counters["connects"] += 1
+            if engine.dialect.name == "postgresql":
+                # Запоминаем PID, чтобы отличать собственные уведомления NOTIFY от чужих
+                cursor = dbapi_connection.cursor()
+                try:
+                    cursor.execute("SELECT pg_backend_pid()")
+                    backend_pid = cursor.fetchone()[0]
+                finally:
+                    cursor.close()
+                dbapi_connection.rollback()
+                connection_record.info["backend_pid"] = backend_pid
+                cls._backend_pids.add(backend_pid)
+
+        @event.listens_for(engine, "close")
+        def _on_close(dbapi_connection, connection_record): # noqa
+            cls._backend_pids.discard(connection_record.info.pop("backend_pid", None))
+
+        @event.listens_for(engine, "detach")
+        def _on_detach(dbapi_connection, connection_record): # noqa
+            cls._backend_pids.discard(connection_record.info.pop("backend_pid", None))
+
+        @event.listens_for(engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy): # noqa
+            counters["checkouts"] += 1
+
+        @event.listens_for(engine, "checkin")
+        def _on_checkin(dbapi_connection, connection_record): # noqa
+            counters["checkins"] += 1
+
+        @event.listens_for(engine, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception): # noqa
+            counters["invalidations"] += 1
+
+
+    @classmethod
+    def dispose_engine(cls):
+        """Закрывает все соединения общего пула (при остановке процесса)."""
+        with cls._engine_lock:
+            if cls._engine is not None:
+                cls._engine.dispose()
+                cls._engine = None
+
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, Any]:
+        """
+        Возвращает статистику пула соединений.
+
+        :return: Словарь с размером пула, числом занятых/свободных соединений и счетчиками событий.
+        """
+        stats = dict(cls._pool_counters)
+        if cls._engine is None:
+            stats["initialized"] = False
+            return stats
+
+        pool = cls._engine.pool
+        stats.update({
+            "initialized": True,
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "status": pool.status(),
+        })
+        return stats
+
+
+    @classmethod
+    def is_own_backend(cls, backend_pid: int) -> bool:
+        """Проверяет, принадлежит ли серверный процесс PostgreSQL пулу этого процесса."""
+        return backend_pid in cls._backend_pids
 
 
     def close_connection(self):
-        """Закрывает соединение с базой данных."""
-        if self.engine:
-            self.engine.dispose()
+        """
+        Освобождает помощник. Соединения возвращаются в общий пул сразу после запроса,
+        поэтому движок здесь не закрывается (см. dispose_engine).
+        """
+        self.engine = None
+
+
+    @contextmanager
+    def session(self):
+        """
+        Контекстный менеджер транзакции: выдает соединение из пула,
+        фиксирует изменения при успешном выходе и откатывает их при ошибке.
+
+        Пример:
+            with DbHelper().session() as connection:
+                connection.execute(text(query), params)
+        """
+        with self.engine.connect() as connection:
+            transaction = connection.begin()
+            try:
+                yield connection
+                transaction.commit()
+            except Exception as e:
+                transaction.rollback()
+                log(f"Ошибка в транзакции: {e}")
+                raise
 
 
     # Выполнение SQL-запроса
@@ -78,6 +251,8 @@ class DbHelper:
     def read_query(self, query, params: dict = None):
         """
         Читает данные из базы данных и возвращает их как DataFrame.
+        Предназначен для аналитических выборок; для точечных запросов
+        используйте fetch_scalar / fetch_one / fetch_all / fetch_column.
 
         :param query: SQL-запрос (строка).
         :param params: Параметры для запроса (словарь или кортеж).
@@ -95,3 +270,129 @@ class DbHelper:
             log(f"Ошибка при чтении данных: {e}")
             raise
 
+
+    def fetch_scalar(self, query, params: dict = None) -> Any:
+        """
+        Возвращает первое значение первой строки результата (без pandas).
+
+        :param query: SQL-запрос (строка).
+        :param params: Параметры для запроса.
+        :return: Значение или None, если запрос не вернул строк.
+        """
+        try:
+            with self.engine.connect() as connection:
+                return connection.execute(text(query), params or {}).scalar()
+        except SQLAlchemyError as e:
+            log(f"Ошибка при чтении данных: {e}")
+            raise
+
+
+    def fetch_one(self, query, params: dict = None, as_dict: bool = False) -> Optional[Any]:
+        """
+        Возвращает первую строку результата (без pandas).
+
+        :param query: SQL-запрос (строка).
+        :param params: Параметры для запроса.
+        :param as_dict: Вернуть строку как словарь вместо именованного кортежа.
+        :return: Строка (Row или dict) либо None, если запрос не вернул строк.
+        """
+        try:
+            with self.engine.connect() as connection:
+                row = connection.execute(text(query), params or {}).first()
+        except SQLAlchemyError as e:
+            log(f"Ошибка при чтении данных: {e}")
+            raise
+        if row is None:
+            return None
+        return dict(row._mapping) if as_dict else row
+
+
+    def fetch_all(self, query, params: dict = None, as_dict: bool = False) -> List[Any]:
+        """
+        Возвращает все строки результата (без pandas).
+
+        :param query: SQL-запрос (строка).
+        :param params: Параметры для запроса.
+        :param as_dict: Вернуть строки как словари вместо именованных кортежей.
+        :return: Список строк (Row или dict).
+        """
+        try:
+            with self.engine.connect() as connection:
+                result = connection.execute(text(query), params or {})
+                if as_dict:
+                    return [dict(row) for row in result.mappings()]
+                return result.all()
+        except SQLAlchemyError as e:
+            log(f"Ошибка при чтении данных: {e}")
+            raise
+
+
+    def fetch_column(self, query, params: dict = None) -> List[Any]:
+        """
+        Возвращает значения первой колонки результата (без pandas).
+
+        :param query: SQL-запрос (строка).
+        :param params: Параметры для запроса.
+        :return: Список значений.
+        """
+        try:
+            with self.engine.connect() as connection:
+                return connection.execute(text(query), params or {}).scalars().all()
+        except SQLAlchemyError as e:
+            log(f"Ошибка при чтении данных: {e}")
+            raise
+
+
+    def bulk_insert(self, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+                    connection=None, use_copy: Optional[bool] = None,
+                    batch_size: int = BULK_BATCH_SIZE) -> int:
+        """
+        Массовая загрузка строк в таблицу.
+        Для PostgreSQL строки передаются пачками через COPY FROM STDIN,
+        для остальных драйверов - через executemany многострочными пачками.
+
+        :param table: Имя таблицы (вместе со схемой).
+        :param columns: Список колонок.
+        :param rows: Итерируемый набор строк (кортежей значений в порядке columns).
+        :param connection: Открытое соединение (загрузка в его транзакции). Если не указано,
+                           используется отдельная транзакция.
+        :param use_copy: Принудительно включить/выключить COPY (по умолчанию - автоопределение).
+        :param batch_size: Количество строк в одной пачке.
+        :return: Количество загруженных строк.
+        """
+        if connection is None:
+            with self.session() as connection:
+                return self.bulk_insert(table, columns, rows, connection, use_copy, batch_size)
+
+        if use_copy is None:
+            use_copy = connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
+
+        started_at = time.perf_counter()
+        rows = iter(rows)
+        total = 0
+        if use_copy:
+            copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+            cursor = connection.connection.dbapi_connection.cursor()
+            try:
+                while batch := list(islice(rows, batch_size)):
+                    buffer = io.StringIO()
+                    for row in batch:
+                        buffer.write(",".join(_copy_csv_value(value) for value in row))
+                        buffer.write("\n")
+                    buffer.seek(0)
+                    cursor.copy_expert(copy_sql, buffer)
+                    total += len(batch)
+            finally:
+                cursor.close()
+        else:
+            placeholders = ", ".join(f":{column}" for column in columns)
+            query = text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})")
+            while batch := list(islice(rows, batch_size)):
+                connection.execute(query, [dict(zip(columns, row)) for row in batch])
+                total += len(batch)
+
+        elapsed = time.perf_counter() - started_at
+        rate = total / elapsed if elapsed > 0 else float(total)
+        log(f"[DbHelper] в {table} загружено {total} строк за {elapsed:.2f} с "
+            f"({rate:.0f} строк/с, {'COPY' if use_copy else 'executemany'})")
+        return total
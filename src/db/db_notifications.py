@@ -0,0 +1,102 @@
+import select
+import threading
+from typing import Callable, Dict, List, Optional
+
+from src.db.db_helper import DbHelper
+from src.utils.logger import log
+
+# Интервал ожидания уведомлений (сек.) и пауза перед переподключением
+LISTEN_POLL_TIMEOUT = 5
+LISTEN_RECONNECT_DELAY = 5
+
+
+# Фоновый слушатель уведомлений PostgreSQL (LISTEN/NOTIFY).
+# Используется для межпроцессной инвалидации кэшей: подписчик получает payload уведомления
+# или None, если уведомления могли быть пропущены: после каждого (пере)подключения, в т.ч. первого,
+# так как изменения между загрузкой кэшей при старте и первым LISTEN тоже не доходят до слушателя.
+class DbNotificationListener:
+    _subscribers: Dict[str, List[Callable[[Optional[str]], None]]] = {}
+    _thread: Optional[threading.Thread] = None
+    _stop_event = threading.Event()
+
+    @staticmethod
+    def subscribe(channel: str, callback: Callable[[Optional[str]], None]):
+        """
+        Подписывает обработчик на канал уведомлений.
+        Подписки нужно оформить до вызова start().
+
+        :param channel: Имя канала NOTIFY.
+        :param callback: Функция, принимающая payload уведомления (или None - "сбросить все").
+        """
+        DbNotificationListener._subscribers.setdefault(channel, []).append(callback)
+        if DbNotificationListener._thread is not None:
+            log(f"[DbNotificationListener] подписка на {channel} оформлена после запуска и вступит в силу после переподключения")
+
+    @staticmethod
+    def start():
+        """Запускает фоновый поток слушателя (повторный вызов ничего не делает)."""
+        if DbNotificationListener._thread is not None or not DbNotificationListener._subscribers:
+            return
+        DbNotificationListener._stop_event.clear()
+        DbNotificationListener._thread = threading.Thread(
+            target=DbNotificationListener._run, name="db-notification-listener", daemon=True
+        )
+        DbNotificationListener._thread.start()
+
+    @staticmethod
+    def stop():
+        """Останавливает фоновый поток слушателя."""
+        DbNotificationListener._stop_event.set()
+        if DbNotificationListener._thread is not None:
+            DbNotificationListener._thread.join(timeout=LISTEN_POLL_TIMEOUT + 1)
+            DbNotificationListener._thread = None
+
+    @staticmethod
+    def _dispatch(channel: str, payload: Optional[str]):
+        for callback in DbNotificationListener._subscribers.get(channel, []):
+            try:
+                callback(payload)
+            except Exception as e:
+                log(f"[DbNotificationListener] ошибка обработчика канала {channel}: {e}")
+
+    @staticmethod
+    def _run():
+        stop_event = DbNotificationListener._stop_event
+        while not stop_event.is_set():
+            connection = None
+            try:
+                # Отдельное соединение, изъятое из пула: оно постоянно занято ожиданием уведомлений
+                connection = DbHelper.get_engine().raw_connection()
+                connection.detach()
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                cursor = dbapi_connection.cursor()
+                channels = list(DbNotificationListener._subscribers.keys())
+                for channel in channels:
+                    cursor.execute(f'LISTEN "{channel}"')
+                log(f"[DbNotificationListener] слушаем каналы: {', '.join(channels)}")
+
+                # Пока LISTEN не был выполнен (до первого подключения или во время переподключения),
+                # уведомления могли быть пропущены - подписчики перезагружают данные полностью
+                for channel in channels:
+                    DbNotificationListener._dispatch(channel, None)
+
+                while not stop_event.is_set():
+                    if select.select([dbapi_connection], [], [], LISTEN_POLL_TIMEOUT) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notify = dbapi_connection.notifies.pop(0)
+                        # Собственные изменения процесса уже учтены в кэшах (write-through)
+                        if DbHelper.is_own_backend(notify.pid):
+                            continue
+                        DbNotificationListener._dispatch(notify.channel, notify.payload)
+            except Exception as e:
+                log(f"[DbNotificationListener] ошибка соединения: {e}")
+                stop_event.wait(LISTEN_RECONNECT_DELAY)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception: # noqa
+                        pass
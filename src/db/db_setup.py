@@ -1,5 +1,6 @@
 from src.db.db_helper import DbHelper
 from src.db.interests_loader import InterestsLoader
+from src.db.migrations import apply_migrations
 from src.db.museum_loader import MuseumLoader
 from src.utils.logger import log
 
@@ -9,91 +10,29 @@ def init_db():
     """Инициализация базы данных"""
     db_helper = DbHelper()
     try:
-        # Получаем список существующих схем
-        schemes_df = db_helper.read_query('''
-            SELECT distinct table_schema
-            FROM information_schema.tables 
-            ORDER BY table_schema
-        ''')
-        log(schemes_df)
-
-        # Создаем схему museum, если её нет
-        if 'museum' not in schemes_df['table_schema'].values:
-            db_helper.execute_query('CREATE SCHEMA museum')
-
-        # Создаем необходимые последовательности
-        db_helper.execute_query('''
-            CREATE SEQUENCE IF NOT EXISTS museum.seq_user_interest
-            INCREMENT BY 1 MINVALUE 1 MAXVALUE 9223372036854775807 START 1 CACHE 1 NO CYCLE;
-            
-            CREATE SEQUENCE IF NOT EXISTS museum.seq_interest
-            INCREMENT BY 1 MINVALUE 1 MAXVALUE 9223372036854775807 START 1 CACHE 1 NO CYCLE;
-            
-            CREATE SEQUENCE IF NOT EXISTS museum.seq_museum
-            INCREMENT BY 1 MINVALUE 1 MAXVALUE 9223372036854775807 START 1 CACHE 1 NO CYCLE;
-        ''')
-
-        # Создаем таблицы, если их нет
-        db_helper.execute_query('''
-            CREATE TABLE IF NOT EXISTS museum.interest (
-                interest_id bigint default nextval('museum.seq_interest'),
-                interest_name text,
-                PRIMARY KEY (interest_id)
-            );
-            
-            CREATE TABLE IF NOT EXISTS museum.telegram_user (
-                tg_id bigint PRIMARY KEY
-            );
-
-            CREATE TABLE IF NOT EXISTS museum.user_interest (
-                user_interest_id bigint default nextval('museum.seq_user_interest'),
-                tg_id bigint REFERENCES museum.telegram_user(tg_id),
-                interest_id bigint REFERENCES museum.interest(interest_id),
-                PRIMARY KEY (tg_id, interest_id)
-            );
-            
-            CREATE TABLE IF NOT EXISTS museum.museum (
-                museum_id bigint default nextval('museum.seq_museum'),
-                name text,
-                description text,
-                city text,
-                address text,
-                relative_interests TEXT,
-                PRIMARY KEY (museum_id)
-            );
-            
-            CREATE TABLE IF NOT EXISTS museum.museum_interest (
-                museum_id bigint REFERENCES museum.museum(museum_id),
-                interest_id bigint REFERENCES museum.interest(interest_id),
-                PRIMARY KEY (museum_id, interest_id)
-            );
-        ''')
-
-        # Логирование списка созданных таблиц
-        tables_query = '''
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'museum';
-        '''
-        tables_df = db_helper.read_query(tables_query)
-        created_tables = tables_df['table_name'].tolist()
-        log(f"Список созданных таблиц в схеме museum: {', '.join(created_tables)}")
+        # Создаем/обновляем схему museum через версионированные миграции
+        if apply_migrations(db_helper):
+            # Логирование списка созданных таблиц
+            tables_query = '''
+                SELECT table_name 
+                FROM information_schema.tables 
+                WHERE table_schema = 'museum';
+            '''
+            created_tables = db_helper.fetch_column(tables_query)
+            log(f"Список созданных таблиц в схеме museum: {', '.join(created_tables)}")
 
         # Проверяем, пуста ли таблица museum.interest
-        interests_count = db_helper.read_query('SELECT COUNT(*) FROM museum.interest').iloc[0, 0]
+        interests_count = db_helper.fetch_scalar('SELECT COUNT(*) FROM museum.interest')
         if interests_count == 0:
             log("Таблица museum.interest пуста. Загружаем интересы...")
             InterestsLoader().load_interests()
         else:
             log("Таблица museum.interest уже содержит данные. Пропускаем загрузку интересов.")
 
-        # Проверяем, пуста ли таблица museum.museum
-        museums_count = db_helper.read_query('SELECT COUNT(*) FROM museum.museum').iloc[0, 0]
-        if museums_count == 0:
-            log("Таблица museum.museum пуста. Загружаем музеи...")
-            MuseumLoader().load_museums()
-        else:
-            log("Таблица museum.museum уже содержит данные. Пропускаем загрузку музеев.")
+        # Загружаем новые и измененные музеи (неизмененные записи и их связи с интересами не затрагиваются)
+        museums_count = db_helper.fetch_scalar('SELECT COUNT(*) FROM museum.museum')
+        log(f"Таблица museum.museum содержит {museums_count} музеев. Синхронизируем с CSV...")
+        MuseumLoader().load_museums()
     finally:
         db_helper.close_connection()
 
@@ -121,10 +60,10 @@ def clear_all_tables():
         tables_query = '''
             SELECT table_name
             FROM information_schema.tables
-            WHERE table_schema = 'museum' AND table_type = 'BASE TABLE';
+            WHERE table_schema = 'museum' AND table_type = 'BASE TABLE'
+              AND table_name <> 'schema_version';
         '''
-        tables_df = db_helper.read_query(tables_query)
-        tables = tables_df['table_name'].tolist()
+        tables = db_helper.fetch_column(tables_query)
 
         if not tables:
             log("В схеме museum нет таблиц для очистки.")
@@ -0,0 +1,191 @@
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.db.db_helper import DbHelper
+from src.interests import INTERESTS
+from src.utils.logger import log
+from src.utils.text_similarity import levenshtein
+
+# Минимальное сходство (1 - расстояние Левенштейна / длина названия), при котором название
+# с опечаткой или в другой форме ("Военную историю") сопоставляется интересу справочника
+INTEREST_MATCH_MIN_SIMILARITY = float(os.getenv("INTEREST_MATCH_MIN_SIMILARITY", 0.8))
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize_interest(value: str) -> str:
+    """
+    Приводит название интереса к нормализованному виду: нижний регистр, ё -> е, пунктуация,
+    кавычки, дефисы и нумерация списка -> пробелы ("1. «Научно-популярная литература»." ->
+    "научно популярная литература").
+
+    :param value: Название интереса (например, из ответа LLM).
+    :return: Нормализованное название (пустая строка, если названия нет).
+    """
+    words = _NON_WORD_RE.sub(" ", (value or "").lower().replace("ё", "е")).split()
+    while words and words[0].isdigit():
+        words = words[1:]
+    return " ".join(words)
+
+
+# Снимок справочника интересов (после построения не изменяется)
+class _InterestCatalogSnapshot:
+    __slots__ = ("name_to_id", "id_to_name", "id_to_category", "category_to_ids", "normalized_to_id")
+
+    def __init__(self, rows):
+        self.name_to_id: Dict[str, int] = {}
+        self.id_to_name: Dict[int, str] = {}
+        self.normalized_to_id: Dict[str, int] = {}
+        for interest_id, interest_name in rows:
+            self.name_to_id[interest_name] = int(interest_id)
+            self.id_to_name[int(interest_id)] = interest_name
+            self.normalized_to_id[normalize_interest(interest_name)] = int(interest_id)
+
+        self.id_to_category: Dict[int, str] = {}
+        self.category_to_ids: Dict[str, List[int]] = {}
+        for category, interests in INTERESTS.items():
+            ids = [self.name_to_id[name] for name in interests if name in self.name_to_id]
+            self.category_to_ids[category] = ids
+            for interest_id in ids:
+                self.id_to_category[interest_id] = category
+
+
+# Справочник интересов процесса: название <-> ID и принадлежность к категориям.
+# Загружается один раз при старте и обновляется по запросу (refresh).
+class InterestCatalog:
+    _snapshot: Optional[_InterestCatalogSnapshot] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def load(force: bool = False):
+        """
+        Загружает справочник интересов из БД.
+
+        :param force: Перезагрузить справочник, даже если он уже загружен.
+        """
+        if InterestCatalog._snapshot is not None and not force:
+            return
+
+        with InterestCatalog._lock:
+            if InterestCatalog._snapshot is not None and not force:
+                return
+            db_helper = DbHelper()
+            try:
+                rows = db_helper.fetch_all('SELECT interest_id, interest_name FROM museum.interest')
+            finally:
+                db_helper.close_connection()
+            # Подменяем снимок целиком, чтобы читатели не увидели частично построенный справочник
+            InterestCatalog._snapshot = _InterestCatalogSnapshot(rows)
+            log(f"[InterestCatalog] загружено интересов: {len(rows)}")
+
+    @staticmethod
+    def refresh():
+        """Перезагружает справочник интересов из БД."""
+        InterestCatalog.load(force=True)
+
+    @staticmethod
+    def _get_snapshot() -> _InterestCatalogSnapshot:
+        if InterestCatalog._snapshot is None:
+            InterestCatalog.load()
+        return InterestCatalog._snapshot
+
+    @staticmethod
+    def get_id(interest_name: str) -> Optional[int]:
+        """Возвращает ID интереса по названию или None, если интерес не найден."""
+        return InterestCatalog._get_snapshot().name_to_id.get(interest_name)
+
+    @staticmethod
+    def get_name(interest_id: int) -> Optional[str]:
+        """Возвращает название интереса по ID или None, если интерес не найден."""
+        return InterestCatalog._get_snapshot().id_to_name.get(int(interest_id))
+
+    @staticmethod
+    def get_ids(interest_names: List[str]) -> List[int]:
+        """Возвращает ID известных интересов из списка названий (неизвестные пропускаются)."""
+        name_to_id = InterestCatalog._get_snapshot().name_to_id
+        return [name_to_id[name] for name in interest_names if name in name_to_id]
+
+    @staticmethod
+    def resolve_id(interest_name: str,
+                   min_similarity: float = INTEREST_MATCH_MIN_SIMILARITY) -> Optional[int]:
+        """
+        Находит интерес по названию без учета регистра, ё и пунктуации, а если точного совпадения
+        нет - по ближайшему названию справочника (расстояние Левенштейна).
+
+        :param interest_name: Название интереса (например, из ответа LLM).
+        :param min_similarity: Минимальное сходство для неточного совпадения (от 0 до 1).
+        :return: ID интереса или None, если интерес не найден или ближайших названий несколько.
+        """
+        snapshot = InterestCatalog._get_snapshot()
+        interest_id = snapshot.name_to_id.get(interest_name)
+        if interest_id is not None:
+            return interest_id
+        normalized = normalize_interest(interest_name)
+        if not normalized:
+            return None
+        interest_id = snapshot.normalized_to_id.get(normalized)
+        if interest_id is not None:
+            return interest_id
+
+        best_distance, best_ids = None, []
+        for candidate, candidate_id in snapshot.normalized_to_id.items():
+            # Допуск на погрешность float: 15 * (1 - 0.8) должно дать 3, а не 2
+            max_distance = int(max(len(normalized), len(candidate)) * (1 - min_similarity) + 1e-9)
+            if max_distance < 1:
+                continue
+            distance = levenshtein(normalized, candidate, max_distance)
+            if distance > max_distance:
+                continue
+            if best_distance is None or distance < best_distance:
+                best_distance, best_ids = distance, [candidate_id]
+            elif distance == best_distance:
+                best_ids.append(candidate_id)
+        # Два одинаково близких названия - не угадываем
+        return best_ids[0] if len(best_ids) == 1 else None
+
+    @staticmethod
+    def resolve_ids(interest_names: List[str]) -> Tuple[List[int], List[str]]:
+        """
+        Находит интересы по списку названий (см. resolve_id).
+
+        :param interest_names: Названия интересов.
+        :return: ID найденных интересов (без повторов, в порядке названий) и ненайденные названия.
+        """
+        resolved, unresolved = {}, []
+        for interest_name in interest_names:
+            if not normalize_interest(interest_name):
+                continue
+            interest_id = InterestCatalog.resolve_id(interest_name)
+            if interest_id is None:
+                unresolved.append(interest_name)
+            else:
+                resolved[interest_id] = None
+        return list(resolved), unresolved
+
+    @staticmethod
+    def get_names(interest_ids: List[int]) -> List[str]:
+        """Возвращает названия интересов по списку ID (неизвестные пропускаются)."""
+        id_to_name = InterestCatalog._get_snapshot().id_to_name
+        return [id_to_name[int(i)] for i in interest_ids if int(i) in id_to_name]
+
+    @staticmethod
+    def get_category(interest_id: int) -> Optional[str]:
+        """Возвращает категорию интереса по ID."""
+        return InterestCatalog._get_snapshot().id_to_category.get(int(interest_id))
+
+    @staticmethod
+    def get_category_ids(category: str) -> List[int]:
+        """Возвращает ID интересов категории."""
+        return list(InterestCatalog._get_snapshot().category_to_ids.get(category, []))
+
+    @staticmethod
+    def all_ids() -> List[int]:
+        """Возвращает ID всех интересов справочника."""
+        return list(InterestCatalog._get_snapshot().id_to_name.keys())
+
+    @staticmethod
+    def all_names() -> List[str]:
+        """Возвращает названия всех интересов справочника."""
+        return list(InterestCatalog._get_snapshot().name_to_id.keys())
@@ -1,7 +1,6 @@
 import os
 import csv
 import pandas as pd
-from sqlalchemy import text
 
 from src.db.db_helper import DbHelper
 
@@ -48,26 +47,11 @@ class InterestsLoader:
             raise ValueError("Данные не загружены. Сначала вызовите _load_interests_from_csv.")
 
         try:
-            # Преобразуем DataFrame в список словарей для вставки
-            data_to_insert = self.interests_data.to_dict(orient='records')
-
-            # Генерируем SQL-запрос для вставки
-            columns = ", ".join(data_to_insert[0].keys())
-            placeholders = ", ".join([f":{key}" for key in data_to_insert[0].keys()])
-            query = f"INSERT INTO museum.interest ({columns}) VALUES ({placeholders})"
-
-            # Выполняем запрос через DbHelper
-            with self.db_helper.engine.connect() as connection:
-                transaction = connection.begin()  # Начало транзакции
-                try:
-                    for record in data_to_insert:
-                        connection.execute(text(query), record)
-                    transaction.commit()  # Фиксация изменений
-                    print("Интересы успешно добавлены в базу данных!")
-                except Exception as e:
-                    transaction.rollback()  # Откат транзакции при ошибке
-                    print(f"Возникла ошибка при добавлении интересов в базу данных: {e}")
-                    raise
+            # Загружаем все интересы одной пачкой (COPY / executemany) в одной транзакции
+            columns = list(self.interests_data.columns)
+            rows = self.interests_data.itertuples(index=False, name=None)
+            self.db_helper.bulk_insert("museum.interest", columns, rows)
+            print("Интересы успешно добавлены в базу данных!")
         except Exception as e:
             print(f"Ошибка при сохранении интересов в базу данных: {e}")
 
@@ -0,0 +1,319 @@
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from src.db.db_helper import DbHelper
+from src.utils.logger import log
+
+# Ключ advisory-блокировки, чтобы миграции не выполнялись одновременно несколькими процессами
+MIGRATIONS_LOCK_KEY = 741_000_001
+
+# Удаление музеев-дубликатов (одинаковый source_key) перед созданием уникального индекса:
+# остается музей с наименьшим ID, связи с интересами дубликатов переносятся на него
+_DEDUPLICATE_MUSEUMS_SQL = '''
+        CREATE TEMP TABLE museum_duplicate ON COMMIT DROP AS
+        SELECT museum_id, keep_id
+        FROM (
+            SELECT museum_id, min(museum_id) OVER (PARTITION BY source_key) AS keep_id
+            FROM museum.museum
+            WHERE source_key IS NOT NULL
+        ) ranked
+        WHERE museum_id <> keep_id;
+
+        INSERT INTO museum.museum_interest (museum_id, interest_id)
+        SELECT d.keep_id, mi.interest_id
+        FROM museum.museum_interest mi
+        JOIN museum_duplicate d ON d.museum_id = mi.museum_id
+        ON CONFLICT DO NOTHING;
+
+        DELETE FROM museum.museum_interest WHERE museum_id IN (SELECT museum_id FROM museum_duplicate);
+        DELETE FROM museum.museum WHERE museum_id IN (SELECT museum_id FROM museum_duplicate);
+'''
+
+# Версионированные миграции схемы museum: (версия, описание, SQL).
+# Каждый шаг идемпотентен и выполняется в отдельной транзакции.
+# Новые миграции добавляются только в конец списка, существующие не изменяются.
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (1, "Базовая схема: последовательности и таблицы", '''
+        CREATE SCHEMA IF NOT EXISTS museum;
+
+        CREATE SEQUENCE IF NOT EXISTS museum.seq_user_interest
+        INCREMENT BY 1 MINVALUE 1 MAXVALUE 9223372036854775807 START 1 CACHE 1 NO CYCLE;
+
+        CREATE SEQUENCE IF NOT EXISTS museum.seq_interest
+        INCREMENT BY 1 MINVALUE 1 MAXVALUE 9223372036854775807 START 1 CACHE 1 NO CYCLE;
+
+        CREATE SEQUENCE IF NOT EXISTS museum.seq_museum
+        INCREMENT BY 1 MINVALUE 1 MAXVALUE 9223372036854775807 START 1 CACHE 1 NO CYCLE;
+
+        CREATE TABLE IF NOT EXISTS museum.interest (
+            interest_id bigint default nextval('museum.seq_interest'),
+            interest_name text,
+            PRIMARY KEY (interest_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS museum.telegram_user (
+            tg_id bigint PRIMARY KEY
+        );
+
+        CREATE TABLE IF NOT EXISTS museum.user_interest (
+            user_interest_id bigint default nextval('museum.seq_user_interest'),
+            tg_id bigint REFERENCES museum.telegram_user(tg_id),
+            interest_id bigint REFERENCES museum.interest(interest_id),
+            PRIMARY KEY (tg_id, interest_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS museum.museum (
+            museum_id bigint default nextval('museum.seq_museum'),
+            name text,
+            description text,
+            city text,
+            address text,
+            relative_interests TEXT,
+            PRIMARY KEY (museum_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS museum.museum_interest (
+            museum_id bigint REFERENCES museum.museum(museum_id),
+            interest_id bigint REFERENCES museum.interest(interest_id),
+            PRIMARY KEY (museum_id, interest_id)
+        );
+    '''),
+    (2, "Ключ и хэш содержимого музея для инкрементальной загрузки", '''
+        ALTER TABLE museum.museum ADD COLUMN IF NOT EXISTS source_key text;
+        ALTER TABLE museum.museum ADD COLUMN IF NOT EXISTS content_hash text;
+
+        UPDATE museum.museum
+        SET source_key = md5(coalesce(name, '') || '|' || coalesce(address, '')),
+            content_hash = md5(coalesce(name, '') || '|' || coalesce(description, '') || '|'
+                               || coalesce(city, '') || '|' || coalesce(address, ''))
+        WHERE source_key IS NULL;
+    ''' + _DEDUPLICATE_MUSEUMS_SQL + '''
+        CREATE UNIQUE INDEX IF NOT EXISTS museum_source_key_uq ON museum.museum (source_key);
+    '''),
+    (3, "Индексы для поиска по городу, названию интереса и обратных связей", '''
+        CREATE INDEX IF NOT EXISTS museum_city_lower_idx ON museum.museum (lower(city));
+        CREATE UNIQUE INDEX IF NOT EXISTS interest_name_uq ON museum.interest (interest_name);
+        CREATE INDEX IF NOT EXISTS museum_interest_interest_idx ON museum.museum_interest (interest_id, museum_id);
+        CREATE INDEX IF NOT EXISTS user_interest_interest_idx ON museum.user_interest (interest_id, tg_id);
+    '''),
+    (4, "Уведомление об изменении интересов пользователя (инвалидация кэшей)", '''
+        CREATE OR REPLACE FUNCTION museum.notify_user_interest_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('museum_user_interest', CAST(OLD.tg_id AS text));
+            ELSE
+                PERFORM pg_notify('museum_user_interest', CAST(NEW.tg_id AS text));
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS user_interest_notify ON museum.user_interest;
+        CREATE TRIGGER user_interest_notify
+        AFTER INSERT OR UPDATE OR DELETE ON museum.user_interest
+        FOR EACH ROW EXECUTE FUNCTION museum.notify_user_interest_change();
+    '''),
+    (5, "Уведомление об изменении каталога музеев и их связей с интересами", '''
+        CREATE OR REPLACE FUNCTION museum.notify_museum_catalog_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('museum_catalog', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS museum_catalog_notify ON museum.museum;
+        CREATE TRIGGER museum_catalog_notify
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON museum.museum
+        FOR EACH STATEMENT EXECUTE FUNCTION museum.notify_museum_catalog_change();
+
+        DROP TRIGGER IF EXISTS museum_interest_catalog_notify ON museum.museum_interest;
+        CREATE TRIGGER museum_interest_catalog_notify
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON museum.museum_interest
+        FOR EACH STATEMENT EXECUTE FUNCTION museum.notify_museum_catalog_change();
+    '''),
+    (6, "Координаты музеев для поиска ближайших", '''
+        ALTER TABLE museum.museum ADD COLUMN IF NOT EXISTS latitude double precision;
+        ALTER TABLE museum.museum ADD COLUMN IF NOT EXISTS longitude double precision;
+    '''),
+    (7, "Массив ID интересов музея (relative_interests) с GIN-индексом и синхронизацией по связям", '''
+        -- Служебная колонка не влияет на каталог музеев: уведомляем только об изменении его данных
+        DROP TRIGGER IF EXISTS museum_catalog_notify ON museum.museum;
+        CREATE TRIGGER museum_catalog_notify
+        AFTER INSERT OR DELETE OR TRUNCATE
+           OR UPDATE OF name, description, city, address, content_hash, latitude, longitude ON museum.museum
+        FOR EACH STATEMENT EXECUTE FUNCTION museum.notify_museum_catalog_change();
+
+        DO $$
+        BEGIN
+            IF (SELECT data_type FROM information_schema.columns
+                WHERE table_schema = 'museum' AND table_name = 'museum' AND column_name = 'relative_interests') = 'text' THEN
+                ALTER TABLE museum.museum ALTER COLUMN relative_interests TYPE bigint[] USING NULL;
+            END IF;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION museum.refresh_relative_interests(museum_ids bigint[]) RETURNS void AS $$
+            UPDATE museum.museum m
+            SET relative_interests = COALESCE((
+                SELECT array_agg(mi.interest_id ORDER BY mi.interest_id)
+                FROM museum.museum_interest mi
+                WHERE mi.museum_id = m.museum_id
+            ), '{}')
+            WHERE m.museum_id = ANY(museum_ids);
+        $$ LANGUAGE sql;
+
+        ALTER TABLE museum.museum ALTER COLUMN relative_interests SET DEFAULT '{}';
+        SELECT museum.refresh_relative_interests(ARRAY(SELECT museum_id FROM museum.museum));
+        ALTER TABLE museum.museum ALTER COLUMN relative_interests SET NOT NULL;
+        CREATE INDEX IF NOT EXISTS museum_relative_interests_gin ON museum.museum USING gin (relative_interests);
+
+        CREATE OR REPLACE FUNCTION museum.sync_relative_interests() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM museum.refresh_relative_interests(ARRAY(SELECT DISTINCT museum_id FROM new_links));
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM museum.refresh_relative_interests(ARRAY(SELECT DISTINCT museum_id FROM old_links));
+            ELSIF TG_OP = 'UPDATE' THEN
+                PERFORM museum.refresh_relative_interests(ARRAY(
+                    SELECT museum_id FROM old_links UNION SELECT museum_id FROM new_links
+                ));
+            ELSE
+                UPDATE museum.museum SET relative_interests = '{}' WHERE relative_interests <> '{}';
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS museum_interest_sync_insert ON museum.museum_interest;
+        CREATE TRIGGER museum_interest_sync_insert
+        AFTER INSERT ON museum.museum_interest REFERENCING NEW TABLE AS new_links
+        FOR EACH STATEMENT EXECUTE FUNCTION museum.sync_relative_interests();
+
+        DROP TRIGGER IF EXISTS museum_interest_sync_delete ON museum.museum_interest;
+        CREATE TRIGGER museum_interest_sync_delete
+        AFTER DELETE ON museum.museum_interest REFERENCING OLD TABLE AS old_links
+        FOR EACH STATEMENT EXECUTE FUNCTION museum.sync_relative_interests();
+
+        DROP TRIGGER IF EXISTS museum_interest_sync_update ON museum.museum_interest;
+        CREATE TRIGGER museum_interest_sync_update
+        AFTER UPDATE ON museum.museum_interest REFERENCING OLD TABLE AS old_links NEW TABLE AS new_links
+        FOR EACH STATEMENT EXECUTE FUNCTION museum.sync_relative_interests();
+
+        DROP TRIGGER IF EXISTS museum_interest_sync_truncate ON museum.museum_interest;
+        CREATE TRIGGER museum_interest_sync_truncate
+        AFTER TRUNCATE ON museum.museum_interest
+        FOR EACH STATEMENT EXECUTE FUNCTION museum.sync_relative_interests();
+    '''),
+    (8, "Контрольные точки пакетного связывания музеев с интересами", '''
+        CREATE TABLE IF NOT EXISTS museum.linking_checkpoint (
+            museum_id bigint PRIMARY KEY REFERENCES museum.museum(museum_id) ON DELETE CASCADE,
+            content_hash text,
+            status text NOT NULL,
+            attempts integer NOT NULL DEFAULT 0,
+            error text,
+            updated_at timestamptz NOT NULL DEFAULT now()
+        );
+    '''),
+    (9, "Кэш ответов LLM", '''
+        CREATE TABLE IF NOT EXISTS museum.llm_cache (
+            cache_key text PRIMARY KEY,
+            model text,
+            response jsonb NOT NULL,
+            hits integer NOT NULL DEFAULT 0,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            last_used_at timestamptz NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS llm_cache_last_used_idx ON museum.llm_cache (last_used_at);
+    '''),
+    (10, "Сохраненные описания музеев для наборов совпавших интересов", '''
+        CREATE TABLE IF NOT EXISTS museum.museum_description (
+            museum_id bigint REFERENCES museum.museum(museum_id) ON DELETE CASCADE,
+            interest_key text NOT NULL,
+            prompt_version text NOT NULL,
+            content_hash text,
+            description text NOT NULL,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (museum_id, interest_key, prompt_version)
+        );
+    '''),
+    (11, "Ключ и хэш музеев с пустыми полями, удаление дубликатов", '''
+        -- До исправления миграции 2 музеи с пустым названием или адресом получали NULL в source_key
+        -- и content_hash, поэтому загрузка не находила их и добавляла дубликаты
+        DROP INDEX IF EXISTS museum.museum_source_key_uq;
+
+        UPDATE museum.museum
+        SET source_key = md5(coalesce(name, '') || '|' || coalesce(address, '')),
+            content_hash = md5(coalesce(name, '') || '|' || coalesce(description, '') || '|'
+                               || coalesce(city, '') || '|' || coalesce(address, ''))
+        WHERE source_key IS NULL OR content_hash IS NULL;
+    ''' + _DEDUPLICATE_MUSEUMS_SQL + '''
+        CREATE UNIQUE INDEX IF NOT EXISTS museum_source_key_uq ON museum.museum (source_key);
+    '''),
+    (12, "Нормализованный ключ города для поиска музеев города в БД", '''
+        -- Ключ вычисляется в Python при загрузке музеев (normalize_city: регистр, ё, пунктуация, "г.", сокращения),
+        -- существующие музеи получают его при следующей загрузке каталога (MuseumLoader)
+        ALTER TABLE museum.museum ADD COLUMN IF NOT EXISTS city_key text;
+        CREATE INDEX IF NOT EXISTS museum_city_key_idx ON museum.museum (city_key);
+    '''),
+]
+
+# Версия схемы, которую ожидает код
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(db_helper: DbHelper) -> int:
+    """
+    Возвращает текущую версию схемы (0, если миграции еще не применялись).
+
+    :param db_helper: Помощник для работы с БД.
+    """
+    if db_helper.fetch_scalar("SELECT to_regclass('museum.schema_version')") is None:
+        return 0
+    return db_helper.fetch_scalar("SELECT COALESCE(MAX(version), 0) FROM museum.schema_version")
+
+
+def apply_migrations(db_helper: DbHelper) -> int:
+    """
+    Применяет недостающие миграции по порядку.
+    Если версия схемы уже актуальна, DDL не выполняется.
+
+    :param db_helper: Помощник для работы с БД.
+    :return: Количество примененных миграций.
+    """
+    current_version = get_schema_version(db_helper)
+    if current_version >= LATEST_SCHEMA_VERSION:
+        log(f"Схема БД актуальна (версия {current_version}). Миграции не требуются.")
+        return 0
+
+    applied = 0
+    for version, description, sql in MIGRATIONS:
+        if version <= current_version:
+            continue
+        with db_helper.session() as connection:
+            # Блокировка снимается автоматически по завершении транзакции
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+            connection.execute(text('''
+                CREATE SCHEMA IF NOT EXISTS museum;
+                CREATE TABLE IF NOT EXISTS museum.schema_version (
+                    version integer PRIMARY KEY,
+                    description text,
+                    applied_at timestamptz NOT NULL DEFAULT now()
+                );
+            '''))
+            # Миграция могла быть применена другим процессом, пока мы ждали блокировку
+            already_applied = connection.execute(
+                text("SELECT 1 FROM museum.schema_version WHERE version = :version"), {"version": version}
+            ).scalar()
+            if already_applied:
+                continue
+
+            log(f"Применяем миграцию {version}: {description}")
+            connection.execute(text(sql))
+            connection.execute(
+                text("INSERT INTO museum.schema_version (version, description) VALUES (:version, :description)"),
+                {"version": version, "description": description}
+            )
+            applied += 1
+
+    log(f"Схема БД обновлена до версии {LATEST_SCHEMA_VERSION} (применено миграций: {applied}).")
+    return applied
@@ -1,30 +1,80 @@
+import hashlib
 import os
 
 import pandas as pd
 from sqlalchemy import text
 
 from src.db.db_helper import DbHelper
+from src.search.city_names import normalize_city
 from src.utils.logger import log
 
+# Размер порции строк при потоковом чтении museums.csv
+MUSEUM_CSV_CHUNK_SIZE = int(os.getenv("MUSEUM_CSV_CHUNK_SIZE", 5000))
+
+# Колонки исходного CSV и их названия в БД
+CSV_COLUMNS = {
+    "Название": "name",
+    "Описание": "description",
+    "Местоположение": "city",
+    "Улица": "street",
+}
+
+# Необязательные колонки CSV с координатами музея
+COORDINATE_COLUMNS = {
+    "Широта": "latitude",
+    "Долгота": "longitude",
+}
+
+# Колонка CSV с дополнительными данными: если колонок с координатами нет,
+# координаты берутся из точки GeoJSON в этой колонке ("coordinates": [долгота, широта])
+EXTRA_COLUMN = "Прочее"
+GEOJSON_POINT_PATTERN = (
+    r'"coordinates"\s*:\s*\[\s*(?P<longitude>-?\d+(?:\.\d+)?)\s*,\s*(?P<latitude>-?\d+(?:\.\d+)?)\s*\]'
+)
+
+# Колонки, которые загружаются во временную таблицу
+STAGE_COLUMNS = ["source_key", "content_hash", "name", "description", "city", "city_key", "address",
+                 "latitude", "longitude"]
+
+
+def museum_source_key(name: str, address: str) -> str:
+    """
+    Естественный ключ музея (по нему строки CSV сопоставляются с записями в БД).
+    Вычисляется так же, как md5(coalesce(name, '') || '|' || coalesce(address, '')) в PostgreSQL.
+    """
+    return hashlib.md5(f"{name or ''}|{address or ''}".encode("utf-8")).hexdigest()
+
+
+def museum_content_hash(name: str, description: str, city: str, address: str) -> str:
+    """
+    Хэш содержимого музея: меняется при любом изменении полей, влияющих на привязку интересов.
+    Вычисляется так же, как md5(name || '|' || description || '|' || city || '|' || address) в PostgreSQL
+    (пустые поля - как coalesce(поле, '')).
+    """
+    return hashlib.md5(
+        f"{name or ''}|{description or ''}|{city or ''}|{address or ''}".encode("utf-8")
+    ).hexdigest()
+
 
 class MuseumLoader:
-    def __init__(self):
+    def __init__(self, chunk_size: int = MUSEUM_CSV_CHUNK_SIZE):
         self.db_helper = DbHelper()
-        self.museums_df = None
-        self.interests_dict = None
+        self.chunk_size = chunk_size
+        self.stats = {"read": 0, "inserted": 0, "updated": 0, "unchanged": 0}
 
     @staticmethod
-    def _clear_str(str_):
-        """Очистка строки от HTML-тегов и лишних пробелов."""
-        res_str = str_.replace('<p>', '')
-        res_str = res_str.lstrip()
-        res_str = res_str.lstrip('<span>')
-        return res_str
-
-    def _load_data_from_csv(self):
-        """Загрузка данных из CSV-файла museums.csv в директории assets."""
+    def _clear_series(series: pd.Series) -> pd.Series:
+        """Векторная очистка колонки от HTML-тегов и лишних пробелов."""
+        return (
+            series.astype(str)
+            .str.replace('<p>', '', regex=False)
+            .str.lstrip()
+            .str.lstrip('<span>')
+        )
 
-        # Определяем путь к файлу museums.csv
+    @staticmethod
+    def _get_csv_path() -> str:
+        """Путь к файлу museums.csv в директории assets."""
         current_dir = os.path.dirname(os.path.abspath(__file__))
         root_dir = os.path.abspath(os.path.join(current_dir, '..', '..'))
         assets_dir = os.path.join(root_dir, 'assets')
@@ -33,90 +83,168 @@ class MuseumLoader:
         # Проверяем существование файла
         if not os.path.exists(csv_path):
             raise FileNotFoundError(f"Файл museums.csv не найден в директории {assets_dir}")
+        return csv_path
 
-        """Загрузка данных из CSV."""
-        self.museums_df = pd.read_csv(
-            csv_path,
+    def _iter_csv_chunks(self):
+        """Потоковое чтение museums.csv порциями фиксированного размера."""
+        return pd.read_csv(
+            self._get_csv_path(),
             sep=',',
-            usecols=["Название", "Описание", "Местоположение", "Улица"]
+            usecols=lambda column: column in CSV_COLUMNS or column in COORDINATE_COLUMNS or column == EXTRA_COLUMN,
+            dtype=str,
+            chunksize=self.chunk_size,
         )
-        log("Данные из CSV успешно загружены.")
-
-    def _clean_data(self):
-        """Очистка и предобработка данных."""
-        if self.museums_df is None:
-            raise ValueError("Данные не загружены. Сначала нужно вызвать _load_data_from_csv.")
 
+    @staticmethod
+    def _extract_coordinates(chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Координаты музеев порции: из колонок "Широта"/"Долгота", а где их нет - из точки GeoJSON
+        в колонке "Прочее". Отсутствующие и некорректные координаты заменяются на None.
+        """
+        coordinates = pd.DataFrame(index=chunk.index, columns=["latitude", "longitude"], dtype=float)
+        for source, column in COORDINATE_COLUMNS.items():
+            if source in chunk:
+                coordinates[column] = pd.to_numeric(chunk[source].str.replace(",", ".", regex=False), errors="coerce")
+
+        if EXTRA_COLUMN in chunk:
+            point = chunk[EXTRA_COLUMN].str.extract(GEOJSON_POINT_PATTERN).astype(float)
+            missing = coordinates.isna().any(axis=1)
+            coordinates.loc[missing, ["latitude", "longitude"]] = point.loc[missing, ["latitude", "longitude"]]
+
+        valid = coordinates["latitude"].between(-90, 90) & coordinates["longitude"].between(-180, 180)
+        coordinates = coordinates.where(valid, axis=0)
+        # None вместо NaN, чтобы в БД попал NULL
+        return coordinates.astype(object).where(coordinates.notna(), None)
+
+    def _clean_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Очистка и предобработка порции данных."""
         # Удаляем строки с пустыми значениями в ключевых колонках
-        self.museums_df = self.museums_df.dropna(subset=["Название", "Описание", "Местоположение", "Улица"])
-
-        # Переименовываем колонки
-        self.museums_df = self.museums_df.rename(columns={
-            "Название": "name",
-            "Описание": "description",
-            "Местоположение": "city",
-            "Улица": "street"
-        })
+        chunk = chunk.dropna(subset=list(CSV_COLUMNS.keys())).rename(columns=CSV_COLUMNS)
 
         # Очищаем строки от HTML-тегов и лишних пробелов
-        self.museums_df["name"] = self.museums_df["name"].apply(self._clear_str)
-        self.museums_df["description"] = self.museums_df["description"].apply(self._clear_str)
-        self.museums_df["city"] = self.museums_df["city"].apply(self._clear_str)
-        self.museums_df["street"] = self.museums_df["street"].apply(self._clear_str)
+        for column in CSV_COLUMNS.values():
+            chunk[column] = self._clear_series(chunk[column])
 
         # Формируем колонку address
-        self.museums_df["address"] = self.museums_df["city"] + ", " + self.museums_df["street"]
+        chunk["address"] = chunk["city"] + ", " + chunk["street"]
+        chunk = chunk.drop(columns=["street"])
+        chunk[["latitude", "longitude"]] = self._extract_coordinates(chunk)
+
+        # Ключ и хэш содержимого для инкрементального обновления
+        chunk["source_key"] = [
+            museum_source_key(name, address) for name, address in zip(chunk["name"], chunk["address"])
+        ]
+        chunk["content_hash"] = [
+            museum_content_hash(*values)
+            for values in zip(chunk["name"], chunk["description"], chunk["city"], chunk["address"])
+        ]
+        # Ключ города - тот же, что у разделов каталога музеев (см. MuseumCatalog)
+        chunk["city_key"] = [normalize_city(city) for city in chunk["city"]]
+        return chunk[STAGE_COLUMNS]
 
-        # Удаляем ненужную колонку
-        self.museums_df = self.museums_df.drop(columns=["street"])
-
-        # Создаем пустую колонку relative_interests (без заполнения значений)
-        self.museums_df["relative_interests"] = None
+    @staticmethod
+    def _create_stage_table(connection):
+        """Временная таблица для загружаемых порций (удаляется по завершении транзакции)."""
+        connection.execute(text('''
+            CREATE TEMPORARY TABLE museum_stage (
+                source_key text,
+                content_hash text,
+                name text,
+                description text,
+                city text,
+                city_key text,
+                address text,
+                latitude double precision,
+                longitude double precision
+            ) ON COMMIT DROP
+        '''))
+
+    def _merge_stage(self, connection):
+        """
+        Переносит данные из временной таблицы в museum.museum:
+        новые музеи добавляются, измененные обновляются (их устаревшие связи с интересами удаляются),
+        неизмененные не затрагиваются. Координаты обновляются, только если они есть в файле.
+        Ключ города обновляется и у неизмененных музеев, если он еще не вычислен или изменились правила нормализации.
+        """
+        # Убираем дубликаты ключей внутри файла (остается последняя загруженная строка)
+        connection.execute(text('''
+            DELETE FROM museum_stage s
+            USING museum_stage d
+            WHERE s.source_key = d.source_key AND s.ctid < d.ctid
+        '''))
+
+        # Связи с интересами у измененных музеев больше не актуальны
+        connection.execute(text('''
+            DELETE FROM museum.museum_interest mi
+            USING museum.museum m, museum_stage s
+            WHERE mi.museum_id = m.museum_id
+              AND m.source_key = s.source_key
+              AND m.content_hash IS DISTINCT FROM s.content_hash
+        '''))
+
+        result = connection.execute(text('''
+            INSERT INTO museum.museum (source_key, content_hash, name, description, city, city_key, address,
+                                       latitude, longitude)
+            SELECT source_key, content_hash, name, description, city, city_key, address, latitude, longitude
+            FROM museum_stage
+            ON CONFLICT (source_key) DO UPDATE SET
+                content_hash = EXCLUDED.content_hash,
+                name = EXCLUDED.name,
+                description = EXCLUDED.description,
+                city = EXCLUDED.city,
+                city_key = EXCLUDED.city_key,
+                address = EXCLUDED.address,
+                latitude = COALESCE(EXCLUDED.latitude, museum.latitude),
+                longitude = COALESCE(EXCLUDED.longitude, museum.longitude)
+            WHERE museum.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+               OR (EXCLUDED.latitude IS NOT NULL AND museum.latitude IS DISTINCT FROM EXCLUDED.latitude)
+               OR (EXCLUDED.longitude IS NOT NULL AND museum.longitude IS DISTINCT FROM EXCLUDED.longitude)
+               OR museum.city_key IS DISTINCT FROM EXCLUDED.city_key
+            RETURNING (xmax = 0) AS inserted
+        ''')).scalars().all()
+
+        self.stats["inserted"] = sum(1 for inserted in result if inserted)
+        self.stats["updated"] = len(result) - self.stats["inserted"]
+        self.stats["unchanged"] = self.stats["read"] - len(result)
 
-        log("Данные успешно очищены и подготовлены.")
+    @staticmethod
+    def _fill_city_keys(connection):
+        """Вычисляет ключ города музеям, у которых его нет (например, загруженным до появления ключа)."""
+        rows = connection.execute(text('''
+            SELECT museum_id, city FROM museum.museum WHERE city_key IS NULL
+        ''')).all()
+        if not rows:
+            return
+        connection.execute(text('''
+            UPDATE museum.museum m
+            SET city_key = k.city_key
+            FROM unnest(CAST(:museum_ids AS bigint[]), CAST(:city_keys AS text[])) AS k(museum_id, city_key)
+            WHERE m.museum_id = k.museum_id
+        '''), {
+            "museum_ids": [museum_id for museum_id, _ in rows],
+            "city_keys": [normalize_city(city) for _, city in rows],
+        })
+        log(f"Вычислен ключ города для {len(rows)} музеев.")
 
     def _save_data_to_db(self):
-        """Сохранение данных в базу данных."""
-        if self.museums_df is None:
-            raise ValueError("Данные не загружены. Сначала нужно вызвать _load_data_from_csv.")
-
-        try:
-            # Подготовка данных для вставки
-            data_to_insert = self.museums_df.to_dict(orient='records')
-
-            # Генерация SQL-запроса для вставки
-            columns = ", ".join(data_to_insert[0].keys())
-            placeholders = ", ".join([f":{key}" for key in data_to_insert[0].keys()])
-            query = f"INSERT INTO museum.museum ({columns}) VALUES ({placeholders})"
-
-            # Выполнение запросов через SQLAlchemy
-            with self.db_helper.engine.connect() as connection:
-                transaction = connection.begin()  # Начало транзакции
-                try:
-                    for record in data_to_insert:
-                        connection.execute(text(query), record)
-                    transaction.commit()  # Фиксация изменений
-                    log("Данные успешно сохранены в базу данных.")
-                except Exception as e:
-                    transaction.rollback()  # Откат транзакции при ошибке
-                    log(f"Ошибка при сохранении музеев в БД: {e}")
-                    raise
-        except Exception as e:
-            log(f"Ошибка при обработке данных: {e}")
-            raise
+        """Потоковая загрузка CSV во временную таблицу и инкрементальное обновление museum.museum."""
+        with self.db_helper.session() as connection:
+            self._create_stage_table(connection)
+            for chunk in self._iter_csv_chunks():
+                chunk = self._clean_chunk(chunk)
+                self.stats["read"] += self.db_helper.bulk_insert(
+                    "museum_stage", STAGE_COLUMNS, chunk.itertuples(index=False, name=None), connection
+                )
+            self._merge_stage(connection)
+            self._fill_city_keys(connection)
 
     def load_museums(self):
-        """Основной метод для загрузки музеев из CSV и сохранения в БД."""
+        """Основной метод для загрузки (обновления) музеев из CSV в БД."""
         try:
-            self._load_data_from_csv()
-            self._clean_data()
             self._save_data_to_db()
-            log("Музеи успешно загружены и сохранены в базу данных.")
+            log(f"Музеи успешно загружены: прочитано {self.stats['read']}, добавлено {self.stats['inserted']}, "
+                f"обновлено {self.stats['updated']}, без изменений {self.stats['unchanged']}.")
         except Exception as e:
             log(f"Ошибка при загрузке музеев: {e}")
-            if self.db_helper.engine:
-                with self.db_helper.engine.connect() as connection:
-                    transaction = connection.begin()
-                    transaction.rollback()
         finally:
             self.db_helper.close_connection()
@@ -105,6 +105,103 @@ INTERESTS = {
 }
 
 
+# Ключевые слова и синонимы интересов для лексического связывания с музеями (в словарной форме;
+# название интереса учитывается само). Фраза из нескольких слов засчитывается, только если
+# ее слова идут в описании подряд.
+INTEREST_KEYWORDS = {
+    'Автомобили': ['автомобиль', 'автомобильный', 'ретроавтомобиль', 'автопром', 'мотоцикл', 'автотехника'],
+    'Космос': ['космонавтика', 'космический', 'космонавт', 'ракета', 'ракетный', 'спутник', 'астрономия',
+               'планетарий', 'гагарин'],
+    'Робототехника': ['робот', 'робототехнический', 'искусственный интеллект', 'мехатроника'],
+    'Связь': ['телеграф', 'телефон', 'радио', 'радиосвязь', 'почта', 'почтовый', 'телевидение'],
+    'Инженерное дело': ['инженер', 'инженерный', 'механизм', 'станок', 'машиностроение', 'паровоз', 'изобретение',
+                        'изобретатель'],
+    'История науки': ['ученый', 'научное открытие', 'академия наук', 'история техники'],
+    'Научные исследования': ['исследование', 'эксперимент', 'лаборатория', 'научный центр', 'исследовательский'],
+    'Научно-популярная литература': ['научно популярный', 'популяризация науки', 'научпоп'],
+    'Инновации в образовании': ['интерактивный', 'мультимедийный', 'образовательный', 'обучение', 'мастер класс'],
+    'География': ['географический', 'путешествие', 'путешественник', 'экспедиция', 'карта', 'глобус', 'картография'],
+    'Океанология': ['океан', 'море', 'морской', 'океанариум', 'глубоководный'],
+    'Морские обитатели': ['рыба', 'кит', 'дельфин', 'акула', 'моллюск', 'коралл', 'аквариум', 'океанариум'],
+    'Геологические процессы': ['геология', 'геологический', 'минерал', 'минералогия', 'горная порода', 'вулкан',
+                               'кристалл', 'самоцвет'],
+    'Зоология': ['животное', 'зоологический', 'чучело', 'птица', 'млекопитающее', 'насекомое', 'бабочка', 'фауна'],
+    'Ботаника': ['растение', 'ботанический', 'ботанический сад', 'гербарий', 'флора', 'оранжерея'],
+    'Палеонтология': ['динозавр', 'палеонтологический', 'окаменелость', 'ископаемый', 'мамонт', 'доисторический'],
+    'Генетика': ['ген', 'генетический', 'днк', 'наследственность', 'геном'],
+    'Экология': ['экологический', 'охрана природы', 'окружающая среда', 'природоохранный'],
+    'Эволюция': ['эволюционный', 'дарвин', 'дарвиновский', 'происхождение человека', 'антропология',
+                 'естественный отбор'],
+    'Национальные парки': ['национальный парк', 'заповедник', 'природный парк', 'заказник'],
+    'Отечественная история': ['история россии', 'российская история', 'история края', 'краеведение',
+                              'краеведческий', 'история города'],
+    'Всеобщая история': ['мировая история', 'история человечества', 'цивилизация'],
+    'Древний мир': ['древний египет', 'египетский', 'месопотамия', 'первобытный', 'древность'],
+    'Древняя Русь': ['древнерусский', 'русь', 'княжество', 'князь', 'кремль', 'летопись'],
+    'Античность': ['античный', 'древняя греция', 'древний рим', 'амфора'],
+    'Средневековье': ['средневековый', 'рыцарь', 'рыцарский', 'замок', 'доспехи'],
+    'Новое время': ['петровская эпоха', 'петр первый', 'екатерина вторая', 'xviii век', 'дворянский', 'дворянство'],
+    'Новейшая история': ['советский', 'ссср', 'советская эпоха', 'xx век', 'перестройка'],
+    'Военная история': ['военный', 'военно исторический', 'оружие', 'армия', 'сражение', 'битва', 'боевой',
+                        'воинский', 'танк', 'артиллерия', 'флот'],
+    'Война 1812 года': ['1812', 'отечественная война 1812', 'бородино', 'бородинское сражение', 'наполеон',
+                        'кутузов'],
+    'Первая мировая война': ['первая мировая', '1914'],
+    'Вторая мировая война': ['великая отечественная война', 'великая отечественная', 'блокада',
+                             'сталинградская битва', '1941', '1945'],
+    'Революция': ['революционный', 'революционер', 'октябрьская революция', '1917', 'большевик', 'восстание'],
+    'Исторические личности': ['мемориальный', 'мемориальная квартира', 'биография', 'жизнь и творчество',
+                              'полководец', 'император'],
+    'Архивы и документы': ['архив', 'архивный', 'документ', 'грамота', 'фотодокумент'],
+    'Этнография': ['этнографический', 'быт', 'национальный костюм', 'этнос', 'этнический', 'народы'],
+    'Археология': ['археологический', 'раскопки', 'курган', 'городище', 'артефакт'],
+    'Народные традиции': ['традиция', 'фольклор', 'обряд', 'народный праздник', 'народное творчество'],
+    'Культурное наследие': ['наследие', 'объект культурного наследия', 'юнеско'],
+    'Исторические памятники': ['памятник истории', 'монумент', 'мемориал', 'крепость'],
+    'Музеи': ['музееведение', 'музейное дело'],
+    'Памятники культуры': ['памятник культуры', 'памятник архитектуры', 'достопримечательность'],
+    'Исторические места': ['историческое место', 'усадьба', 'поле битвы', 'старинный'],
+    'Традиционные ремесла': ['ремесло', 'ремесленный', 'промысел', 'народный промысел', 'гончарный', 'керамика',
+                             'вышивка', 'резьба', 'кузнечный', 'ткачество', 'игрушка'],
+    'Архитектура': ['архитектурный', 'зодчество', 'особняк', 'дворец', 'архитектурный ансамбль', 'архитектор'],
+    'Классическая музыка': ['композитор', 'симфония', 'симфонический', 'оркестр', 'чайковский'],
+    'Современная музыка': ['рок', 'рок музыка', 'поп музыка', 'джаз', 'эстрада', 'эстрадный'],
+    'Народная музыка': ['народная песня', 'гармонь', 'балалайка', 'гусли', 'частушка'],
+    'Музыкальные инструменты': ['скрипка', 'фортепиано', 'рояль', 'орган', 'гармонь', 'балалайка', 'гусли'],
+    'История музыки': ['музыка', 'музыкальный', 'музыкант', 'граммофон', 'патефон', 'пластинка'],
+    'Живопись': ['картина', 'художник', 'живописный', 'полотно', 'холст', 'пейзаж', 'портрет', 'картинная галерея',
+                 'художественный музей'],
+    'Скульптура': ['скульптор', 'скульптурный', 'статуя', 'бюст', 'изваяние', 'барельеф'],
+    'Фреска': ['настенная роспись', 'роспись'],
+    'Мозаика': ['мозаичный', 'смальта'],
+    'Графика': ['гравюра', 'рисунок', 'литография', 'офорт', 'эстамп', 'плакат', 'иллюстрация'],
+    'Фотография': ['фотограф', 'фото', 'фотоаппарат', 'фотовыставка', 'снимок'],
+    'Современное искусство': ['инсталляция', 'перформанс', 'авангард', 'авангардный', 'абстракция',
+                              'арт пространство', 'медиаискусство', 'современный художник'],
+    'Уличное искусство': ['граффити', 'стрит арт', 'мурал'],
+    'Художественная проза': ['писатель', 'роман', 'литературный', 'повесть', 'проза'],
+    'Поэзия': ['поэт', 'стихи', 'стихотворение', 'поэтический', 'пушкин', 'лермонтов', 'есенин'],
+    'Документальная литература': ['мемуары', 'воспоминания', 'дневник', 'публицистика', 'очерк'],
+    'Книги и рукописи': ['книга', 'книжный', 'рукопись', 'библиотека', 'книгопечатание', 'старопечатный'],
+    'Драматический театр': ['драма', 'драматический', 'спектакль', 'актер', 'актриса', 'драматург'],
+    'Музыкальный театр': ['оперетта', 'мюзикл'],
+    'Современный театр': ['современная драматургия', 'экспериментальный театр', 'режиссер'],
+    'Балет': ['балерина', 'балетный', 'хореография', 'танец', 'пуанты'],
+    'Опера': ['оперный', 'певец', 'певица', 'либретто'],
+    'История театра': ['театр', 'театральный', 'сцена', 'декорация', 'афиша', 'кукольный театр'],
+    'Художественные фильмы': ['фильм', 'кинофильм', 'киностудия', 'съемки'],
+    'Документальное кино': ['документальный фильм', 'кинохроника', 'хроника'],
+    'Анимация': ['мультфильм', 'мультипликация', 'анимационный', 'мультипликатор'],
+    'История кинематографа': ['кино', 'кинематограф', 'кинотеатр', 'киноаппарат', 'кинокамера'],
+    'Религия': ['религиозный', 'церковь', 'храм', 'монастырь', 'мечеть', 'синагога', 'православный',
+                'православие', 'ислам', 'буддизм', 'дацан'],
+    'Духовность': ['духовный', 'святой', 'молитва', 'паломничество'],
+    'История религий': ['история религии', 'христианство', 'религиоведение', 'старообрядчество'],
+    'Святыни': ['святыня', 'мощи', 'икона', 'чудотворная икона', 'реликвия'],
+    'Церковная архитектура': ['храм', 'собор', 'церковь', 'колокольня', 'купол', 'звонница', 'монастырь']
+}
+
+
 def flatten_interests(interests: Dict[str, List[str]]) -> List[str]:
     """
     Преобразует иерархическую структуру интересов в плоский список.
@@ -0,0 +1,300 @@
+import argparse
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from src.db.db_helper import DbHelper
+from src.db.interest_catalog import InterestCatalog
+from src.db.migrations import apply_migrations
+from src.interests import INTERESTS, flatten_interests
+from src.llm.lexical_interests_linker import LexicalInterestLinker
+from src.llm.mistral_connector import MistralConnector
+from src.llm.museum_interests_linker import LINKER_MUSEUMS_PER_PROMPT, MuseumInterestLinker
+from src.search.interest_matcher import InterestMatcher
+from src.utils.logger import log
+from src.utils.rate_limiter import RateLimiter
+
+# Количество одновременных запросов к Mistral, допустимая частота запросов (в секунду),
+# размер пачки результатов, записываемых в БД одной транзакцией, и число попыток для музея
+LINKER_CONCURRENCY = int(os.getenv("LINKER_CONCURRENCY", 4))
+LINKER_RATE_LIMIT = float(os.getenv("LINKER_RATE_LIMIT", 1))
+LINKER_BATCH_SIZE = int(os.getenv("LINKER_BATCH_SIZE", 20))
+LINKER_MAX_ATTEMPTS = int(os.getenv("LINKER_MAX_ATTEMPTS", 3))
+# Сколько секунд бот ждет связывания музеев, если ни один из найденных музеев еще не связан
+LINKER_WAIT_TIMEOUT = float(os.getenv("LINKER_WAIT_TIMEOUT", 60))
+# Сначала связывать музеи лексически (без LLM), а LLM запрашивать только для спорных музеев
+LINKER_LEXICAL_ENABLED = os.getenv("LINKER_LEXICAL_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Статусы музея в museum.linking_checkpoint
+STATUS_LINKED = "linked"
+STATUS_FAILED = "failed"
+
+
+# Пакетное связывание музеев с интересами: обходит все музеи без связей (в т.ч. музеи, чье содержимое
+# изменилось после связывания), связывает очевидные случаи лексически, по остальным параллельно
+# запрашивает Mistral с ограничением частоты и записывает результаты пачками. Прогресс сохраняется
+# в museum.linking_checkpoint, поэтому после сбоя повторный запуск продолжает с необработанных музеев.
+class BulkInterestLinker:
+    # Фоновое связывание из бота: задачи выполняются по очереди в одном потоке
+    _background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-linker")
+
+    def __init__(
+            self,
+            mistral_connector: Optional[MistralConnector],
+            concurrency: int = LINKER_CONCURRENCY,
+            rate_limit: float = LINKER_RATE_LIMIT,
+            batch_size: int = LINKER_BATCH_SIZE,
+            max_attempts: int = LINKER_MAX_ATTEMPTS,
+            museums_per_prompt: int = LINKER_MUSEUMS_PER_PROMPT,
+            lexical: bool = LINKER_LEXICAL_ENABLED,
+    ):
+        """
+        :param mistral_connector: Объект для интеграции с Mistral API (None - только лексическое связывание, без сети).
+        :param concurrency: Количество одновременных запросов к Mistral.
+        :param rate_limit: Допустимое количество запросов в секунду (0 - без ограничения).
+        :param batch_size: Сколько результатов записывать в БД одной транзакцией.
+        :param max_attempts: Сколько раз пытаться связать музей, если запросы завершаются ошибкой.
+        :param museums_per_prompt: Сколько музеев классифицировать одним запросом к Mistral.
+        :param lexical: Связывать очевидные случаи без LLM и передавать LLM только кандидатов.
+        """
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = RateLimiter(rate_limit, burst=self.concurrency)
+        # Токен ограничителя берется перед каждым запросом, включая повторы при разбиении пакета
+        self.linker = (MuseumInterestLinker(mistral_connector, before_request=self.rate_limiter.acquire)
+                       if mistral_connector is not None else None)
+        self.lexical = lexical or self.linker is None
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max_attempts
+        self.museums_per_prompt = max(1, museums_per_prompt)
+        self.all_interests = flatten_interests(INTERESTS)
+        self.db_helper = DbHelper()
+        self.stats = {"pending": 0, "processed": 0, "linked": 0, "empty": 0, "failed": 0, "links": 0,
+                      "lexical": 0, "skipped": 0}
+        # Результаты лексического связывания текущего запуска: уверенные интересы и кандидаты для LLM
+        self._lexical_links: Dict[int, List[str]] = {}
+        self._candidates: Dict[int, List[str]] = {}
+
+    def pending_museums(self, limit: Optional[int] = None,
+                        museum_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Музеи, которые нужно связать: без связей с интересами и без отметки об успешном связывании
+        текущей версии содержимого, а также музеи с ошибками, у которых остались попытки.
+
+        :param limit: Максимальное количество музеев.
+        :param museum_ids: Ограничить выборку указанными музеями.
+        """
+        query = '''
+            SELECT m.museum_id, m.name, m.description, m.content_hash
+            FROM museum.museum m
+            LEFT JOIN museum.linking_checkpoint c
+                   ON c.museum_id = m.museum_id AND c.content_hash IS NOT DISTINCT FROM m.content_hash
+            WHERE m.relative_interests = '{}'
+              AND (c.museum_id IS NULL OR (c.status = :failed AND c.attempts < :max_attempts))
+              AND (CAST(:museum_ids AS bigint[]) IS NULL OR m.museum_id = ANY(CAST(:museum_ids AS bigint[])))
+            ORDER BY m.museum_id
+            LIMIT :limit;
+        '''
+        params = {
+            "failed": STATUS_FAILED,
+            "max_attempts": self.max_attempts,
+            "museum_ids": [int(i) for i in museum_ids] if museum_ids is not None else None,
+            "limit": limit,
+        }
+        return self.db_helper.fetch_all(query, params, as_dict=True)
+
+    def _link_group(self, museums: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Optional[List[int]], Optional[str]]]:
+        """
+        Связывает группу музеев пакетным запросом (с повторами частями).
+        Для каждого музея: (музей, ID интересов или None при ошибке, текст ошибки). Ошибкой отмечаются
+        только музеи неудавшихся запросов, связи остальных музеев группы сохраняются.
+        """
+        linked, errors = self.linker.link_museums_interests(museums, self.all_interests, candidates=self._candidates)
+        results = []
+        for museum in museums:
+            museum_id = int(museum["museum_id"])
+            if museum_id in errors:
+                results.append((museum, None, errors[museum_id]))
+            else:
+                results.append((museum, self._interest_ids(museum, linked.get(museum_id, [])), None))
+        return results
+
+    def _interest_ids(self, museum: Dict[str, Any], interests: List[str]) -> List[int]:
+        """ID интересов музея: лексически найденные и выбранные LLM (без повторов)."""
+        lexical_ids = InterestCatalog.get_ids(self._lexical_links.get(int(museum["museum_id"]), []))
+        return list(dict.fromkeys(lexical_ids + MuseumInterestLinker.resolve_interests(interests)))
+
+    def _split_lexical(self, museums: List[Dict[str, Any]]) -> Tuple[List[Tuple], List[Dict[str, Any]]]:
+        """
+        Связывает музеи лексически.
+
+        :return: Результаты для музеев, связанных без LLM, и музеи, которые нужно передать LLM.
+        """
+        resolved, remaining = [], []
+        for museum, match in zip(museums, LexicalInterestLinker.classify(museums)):
+            museum_id = int(museum["museum_id"])
+            if match.resolved:
+                resolved.append((museum, InterestCatalog.get_ids(match.linked), None))
+            elif self.linker is None:
+                # Без LLM музей со спорными интересами или без совпадений не отмечается как связанный
+                # и остается в очереди до запуска с LLM (частичные связи не записываются)
+                self.stats["skipped"] += 1
+            else:
+                self._lexical_links[museum_id] = match.linked
+                if match.candidates:
+                    self._candidates[museum_id] = match.candidates
+                remaining.append(museum)
+        self.stats["lexical"] = len(resolved)
+        return resolved, remaining
+
+    def _save_batch(self, results: List[Tuple[Dict[str, Any], Optional[List[int]], Optional[str]]]):
+        """Записывает связи и контрольные точки пачки музеев одной транзакцией."""
+        links = {int(museum["museum_id"]): interest_ids for museum, interest_ids, _ in results if interest_ids}
+
+        with self.db_helper.session() as connection:
+            MuseumInterestLinker.save_linked_interests(links, connection)
+
+            connection.execute(text('''
+                INSERT INTO museum.linking_checkpoint (museum_id, content_hash, status, attempts, error)
+                SELECT museum_id, content_hash, status, 1, error
+                FROM unnest(CAST(:museum_ids AS bigint[]), CAST(:hashes AS text[]),
+                            CAST(:statuses AS text[]), CAST(:errors AS text[])) AS t(museum_id, content_hash, status, error)
+                ON CONFLICT (museum_id) DO UPDATE SET
+                    attempts = CASE
+                        WHEN linking_checkpoint.content_hash IS NOT DISTINCT FROM EXCLUDED.content_hash
+                        THEN linking_checkpoint.attempts + 1 ELSE 1
+                    END,
+                    content_hash = EXCLUDED.content_hash,
+                    status = EXCLUDED.status,
+                    error = EXCLUDED.error,
+                    updated_at = now()
+            '''), {
+                "museum_ids": [int(museum["museum_id"]) for museum, _, _ in results],
+                "hashes": [museum["content_hash"] for museum, _, _ in results],
+                "statuses": [STATUS_FAILED if error else STATUS_LINKED for _, _, error in results],
+                "errors": [error for _, _, error in results],
+            })
+
+        # Обновляем индекс подбора музеев текущего процесса (другие процессы получат уведомление из БД)
+        for museum, interest_ids, _ in results:
+            if interest_ids:
+                InterestMatcher.update_museum_interests(museum["museum_id"], interest_ids)
+
+        for museum, interest_ids, error in results:
+            self.stats["processed"] += 1
+            if error:
+                self.stats["failed"] += 1
+                log(f"[BulkInterestLinker] ошибка связывания музея {museum['museum_id']}: {error}")
+            elif interest_ids:
+                self.stats["linked"] += 1
+                self.stats["links"] += len(interest_ids)
+            else:
+                self.stats["empty"] += 1
+
+    def _log_progress(self, started: float):
+        elapsed = time.monotonic() - started
+        rate = self.stats["processed"] / elapsed if elapsed > 0 else 0.0
+        log(f"[BulkInterestLinker] обработано {self.stats['processed']} из {self.stats['pending']} "
+            f"({rate:.2f} музеев/с): связано {self.stats['linked']} (связей {self.stats['links']}), "
+            f"без интересов {self.stats['empty']}, ошибок {self.stats['failed']}")
+
+    def run(self, limit: Optional[int] = None, museum_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        """
+        Связывает все ожидающие музеи.
+
+        :param limit: Максимальное количество музеев за запуск.
+        :param museum_ids: Связать только указанные музеи (если они еще не связаны).
+        :return: Статистика запуска.
+        """
+        try:
+            museums = self.pending_museums(limit, museum_ids)
+            self.stats["pending"] = len(museums)
+            if not museums:
+                log("[BulkInterestLinker] музеев для связывания нет")
+                return self.stats
+
+            started = time.monotonic()
+            if self.lexical:
+                resolved, museums = self._split_lexical(museums)
+                for start in range(0, len(resolved), self.batch_size):
+                    self._save_batch(resolved[start:start + self.batch_size])
+                log(f"[BulkInterestLinker] связано без LLM: {len(resolved)}, на проверку LLM: {len(museums)}, "
+                    f"пропущено: {self.stats['skipped']}")
+                if not museums:
+                    self._log_progress(started)
+                    return self.stats
+
+            log(f"[BulkInterestLinker] музеев для связывания: {len(museums)}, потоков {self.concurrency}, "
+                f"лимит {self.rate_limiter.rate:g} запросов/с, музеев в запросе {self.museums_per_prompt}")
+            groups = [museums[i:i + self.museums_per_prompt] for i in range(0, len(museums), self.museums_per_prompt)]
+            batch = []
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="linker") as executor:
+                for results in executor.map(self._link_group, groups):
+                    batch.extend(results)
+                    if len(batch) >= self.batch_size:
+                        self._save_batch(batch)
+                        batch = []
+                        self._log_progress(started)
+                if batch:
+                    self._save_batch(batch)
+            self._log_progress(started)
+            return self.stats
+        finally:
+            self.db_helper.close_connection()
+
+    @staticmethod
+    def schedule(museum_ids: List[int]) -> Future:
+        """
+        Ставит связывание музеев в очередь фонового потока.
+
+        :param museum_ids: ID музеев.
+        :return: Future задачи (завершается после записи результатов; ошибки только логируются).
+        """
+        def job():
+            try:
+                BulkInterestLinker(MistralConnector()).run(museum_ids=museum_ids)
+            except Exception as e:
+                log(f"[BulkInterestLinker] ошибка фонового связывания: {e}")
+
+        return BulkInterestLinker._background_executor.submit(job)
+
+
+# Запуск: python -m src.llm.bulk_interests_linker [--limit N] [--concurrency N] [--rate N] [--per-prompt N]
+#         [--offline | --no-lexical]
+def main():
+    parser = argparse.ArgumentParser(description="Пакетное связывание музеев с интересами с помощью Mistral")
+    parser.add_argument("--limit", type=int, default=None, help="максимальное количество музеев за запуск")
+    parser.add_argument("--concurrency", type=int, default=LINKER_CONCURRENCY, help="одновременных запросов к Mistral")
+    parser.add_argument("--rate", type=float, default=LINKER_RATE_LIMIT, help="запросов в секунду (0 - без ограничения)")
+    parser.add_argument("--batch-size", type=int, default=LINKER_BATCH_SIZE, help="результатов на транзакцию")
+    parser.add_argument("--max-attempts", type=int, default=LINKER_MAX_ATTEMPTS, help="попыток для одного музея")
+    parser.add_argument("--per-prompt", type=int, default=LINKER_MUSEUMS_PER_PROMPT, help="музеев в одном запросе")
+    parser.add_argument("--offline", action="store_true", help="связать без Mistral только однозначные музеи")
+    parser.add_argument("--no-lexical", action="store_true", help="связывать все музеи с помощью Mistral")
+    args = parser.parse_args()
+
+    db_helper = DbHelper()
+    try:
+        apply_migrations(db_helper)
+    finally:
+        db_helper.close_connection()
+    InterestCatalog.load()
+
+    linker = BulkInterestLinker(
+        None if args.offline else MistralConnector(),
+        concurrency=args.concurrency,
+        rate_limit=args.rate,
+        batch_size=args.batch_size,
+        max_attempts=args.max_attempts,
+        museums_per_prompt=args.per_prompt,
+        lexical=not args.no_lexical,
+    )
+    stats = linker.run(limit=args.limit)
+    log(f"[BulkInterestLinker] готово: {stats}")
+    log(f"[BulkInterestLinker] сопоставление названий интересов: {MuseumInterestLinker.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.interests import INTERESTS, INTEREST_KEYWORDS, flatten_interests
+from src.utils.logger import log
+
+# Пороги косинусной близости описания музея к интересу: с какого интерес привязывается без LLM
+# и с какого попадает в список кандидатов для проверки LLM; сколько кандидатов передавать LLM
+LEXICAL_LINK_THRESHOLD = float(os.getenv("LEXICAL_LINK_THRESHOLD", 0.3))
+LEXICAL_CANDIDATE_THRESHOLD = float(os.getenv("LEXICAL_CANDIDATE_THRESHOLD", 0.1))
+LEXICAL_MAX_CANDIDATES = int(os.getenv("LEXICAL_MAX_CANDIDATES", 10))
+# Сколько раз ключевые слова интереса должны встретиться в тексте, чтобы привязать его без LLM
+# (одно случайное упоминание в коротком описании дает высокую близость)
+LEXICAL_MIN_HITS = int(os.getenv("LEXICAL_MIN_HITS", 2))
+
+# Сколько музеев векторизовать для одного матричного умножения
+_SCORING_CHUNK_SIZE = 512
+
+_WORD_RE = re.compile(r"[a-zа-я0-9]+")
+
+# Служебные слова и формы слова "музей", которое есть почти в каждом описании
+# (не участвуют в сравнении и не разрывают фразы)
+_STOP_WORDS = frozenset((
+    "и", "в", "во", "на", "с", "со", "по", "о", "об", "от", "до", "из", "к", "ко", "у", "за", "для", "при",
+    "а", "но", "или", "не", "что", "как", "это", "его", "ее", "их", "он", "она", "они", "также",
+    "музей", "музея", "музею", "музеем", "музее", "музеи", "музеев", "музеям", "музеями", "музеях",
+))
+
+# Окончания для стемминга (проверяются от длинных к коротким)
+_ENDINGS = tuple(sorted({
+    # Прилагательные и причастия
+    "ого", "его", "ому", "ему", "ыми", "ими", "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей",
+    "ую", "юю", "ых", "их", "ым", "им",
+    # Существительные
+    "ами", "ями", "ах", "ях", "ам", "ям", "ов", "ев", "ом", "ем", "ия", "ии", "ию", "ья", "ье", "ьи", "ью",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+}, key=len, reverse=True))
+_MIN_STEM_LENGTH = 3
+
+
+def stem(word: str) -> str:
+    """
+    Отбрасывает окончание русского слова, чтобы формы одного слова ("живопись", "живописи",
+    "живописью") сводились к общей основе. Основа не короче трех букв.
+
+    :param word: Слово в нижнем регистре.
+    :return: Основа слова.
+    """
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def stem_words(text: str) -> List[str]:
+    """
+    Основы значимых слов текста по порядку: нижний регистр, ё -> е, без служебных слов.
+
+    :param text: Произвольный текст.
+    :return: Список основ.
+    """
+    words = _WORD_RE.findall((text or "").lower().replace("ё", "е"))
+    return [stem(word) for word in words if word not in _STOP_WORDS]
+
+
+# Результат лексического связывания музея
+class LexicalMatch:
+    __slots__ = ("linked", "candidates")
+
+    def __init__(self, linked: List[str], candidates: List[str]):
+        # Интересы, привязываемые без LLM (близость не ниже LEXICAL_LINK_THRESHOLD)
+        self.linked = linked
+        # Спорные интересы для проверки LLM (по убыванию близости)
+        self.candidates = candidates
+
+    @property
+    def resolved(self) -> bool:
+        """Музей связан без LLM: есть уверенные совпадения и нет спорных."""
+        return bool(self.linked) and not self.candidates
+
+    def __repr__(self):
+        return f"LexicalMatch(linked={self.linked!r}, candidates={self.candidates!r})"
+
+
+# Снимок лексического индекса: словарь признаков (основы слов и фраз из ключевых слов),
+# IDF признаков и нормированная матрица TF-IDF интересов (после построения не изменяется)
+class _LexicalIndexSnapshot:
+    __slots__ = ("interest_names", "vocabulary", "idf", "matrix", "membership", "max_ngram")
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        self.interest_names = list(keywords)
+        documents = []
+        for name in self.interest_names:
+            features = set()
+            for phrase in [name] + keywords[name]:
+                stems = stem_words(phrase)
+                if stems:
+                    features.add(" ".join(stems))
+            documents.append(features)
+
+        self.vocabulary: Dict[str, int] = {
+            feature: index for index, feature in enumerate(sorted(set().union(*documents)))
+        }
+        self.max_ngram = max((feature.count(" ") + 1 for feature in self.vocabulary), default=1)
+
+        # Признак, общий для многих интересов (например, "храм"), весит меньше уникального
+        document_frequency = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for features in documents:
+            document_frequency[[self.vocabulary[feature] for feature in features]] += 1
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)).astype(np.float32) + 1
+
+        self.matrix = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, features in enumerate(documents):
+            columns = [self.vocabulary[feature] for feature in features]
+            self.matrix[row, columns] = self.idf[columns]
+        self.membership = (self.matrix > 0).astype(np.float32)
+        self.matrix /= np.maximum(np.linalg.norm(self.matrix, axis=1, keepdims=True), 1e-12)
+
+    def feature_counts(self, text: str) -> Counter:
+        """Количество вхождений признаков словаря в текст (основы слов и фразы подряд идущих слов)."""
+        stems = stem_words(text)
+        counts = Counter()
+        for size in range(1, self.max_ngram + 1):
+            for start in range(len(stems) - size + 1):
+                feature = " ".join(stems[start:start + size])
+                if feature in self.vocabulary:
+                    counts[feature] += 1
+        return counts
+
+    def score(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Сравнивает тексты с интересами.
+
+        :return: Косинусная близость и количество вхождений ключевых слов интереса (матрицы тексты x интересы).
+        """
+        counts = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self.feature_counts(text).items():
+                counts[row, self.vocabulary[feature]] = count
+        hits = counts @ self.membership.T
+
+        vectors = np.log(counts, where=counts > 0, out=np.zeros_like(counts))
+        vectors += counts > 0
+        vectors *= self.idf
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors @ self.matrix.T, hits
+
+
+# Лексическое связывание музеев с интересами без обращения к LLM: описание музея сравнивается
+# с ключевыми словами интересов (TF-IDF, косинусная близость). Интересы с высокой близостью
+# привязываются сразу, спорные передаются LLM коротким списком кандидатов.
+class LexicalInterestLinker:
+    _snapshot: Optional[_LexicalIndexSnapshot] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def load(force: bool = False):
+        """
+        Строит индекс по справочнику интересов и ключевым словам из src/interests.py.
+
+        :param force: Перестроить индекс, даже если он уже построен.
+        """
+        if LexicalInterestLinker._snapshot is not None and not force:
+            return
+
+        with LexicalInterestLinker._lock:
+            if LexicalInterestLinker._snapshot is not None and not force:
+                return
+            keywords = {name: INTEREST_KEYWORDS.get(name, []) for name in flatten_interests(INTERESTS)}
+            LexicalInterestLinker._snapshot = _LexicalIndexSnapshot(keywords)
+            log(f"[LexicalInterestLinker] индекс построен: интересов {len(keywords)}, "
+                f"признаков {len(LexicalInterestLinker._snapshot.vocabulary)}")
+
+    @staticmethod
+    def _get_snapshot() -> _LexicalIndexSnapshot:
+        if LexicalInterestLinker._snapshot is None:
+            LexicalInterestLinker.load()
+        return LexicalInterestLinker._snapshot
+
+    @staticmethod
+    def classify(
+            museums: List[Dict[str, Any]],
+            link_threshold: float = LEXICAL_LINK_THRESHOLD,
+            candidate_threshold: float = LEXICAL_CANDIDATE_THRESHOLD,
+            max_candidates: int = LEXICAL_MAX_CANDIDATES,
+            min_hits: int = LEXICAL_MIN_HITS,
+    ) -> List[LexicalMatch]:
+        """
+        Связывает музеи с интересами по названию и описанию.
+
+        :param museums: Данные музеев (название, описание).
+        :param link_threshold: Близость, с которой интерес привязывается без LLM.
+        :param candidate_threshold: Близость, с которой интерес становится кандидатом для LLM.
+        :param max_candidates: Максимальное количество кандидатов для музея.
+        :param min_hits: Сколько раз ключевые слова интереса должны встретиться, чтобы привязать его без LLM.
+        :return: Результаты в порядке музеев.
+        """
+        snapshot = LexicalInterestLinker._get_snapshot()
+        matches = []
+        for start in range(0, len(museums), _SCORING_CHUNK_SIZE):
+            chunk = museums[start:start + _SCORING_CHUNK_SIZE]
+            scores, hits = snapshot.score([f"{museum.get('name') or ''}. {museum.get('description') or ''}"
+                                           for museum in chunk])
+            confident = (scores >= link_threshold) & (hits >= min_hits)
+            for row, confident_row in zip(scores, confident):
+                order = np.argsort(-row, kind="stable")
+                linked = [snapshot.interest_names[i] for i in order if confident_row[i]]
+                candidates = [snapshot.interest_names[i] for i in order
+                              if row[i] >= candidate_threshold and not confident_row[i]][:max_candidates]
+                matches.append(LexicalMatch(linked, candidates))
+        return matches
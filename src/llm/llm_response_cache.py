@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from src.db.db_helper import DbHelper
+from src.utils.logger import log
+
+# Настройки кэша ответов LLM: включен ли он (по умолчанию выключен), срок жизни записи (сек.),
+# максимальное количество записей и как часто (в записях) удалять устаревшие и лишние
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 30 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", 100))
+
+
+# Кэш ответов LLM в таблице museum.llm_cache (общий для всех процессов).
+# Ключ - хэш параметров запроса (модель, текст, температура, лимит токенов), поэтому одинаковые
+# и повторные запросы не расходуют квоту API. Записи вытесняются по сроку жизни и по давности
+# использования (LRU). Ошибки БД не мешают генерации: запрос просто уходит в API.
+class LlmResponseCache:
+    enabled = LLM_CACHE_ENABLED
+    _lock = threading.Lock()
+    _stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+    _puts_since_eviction = 0
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """
+        Ключ кэша для тела запроса к API.
+
+        :param payload: Тело запроса (model, messages, temperature, max_tokens, response_format).
+        :return: SHA-256 от канонического JSON параметров запроса.
+        """
+        key_fields = {field: payload.get(field) for field in ("model", "messages", "temperature", "max_tokens")}
+        # Формат ответа входит в ключ, только если задан (ключи обычных запросов не меняются)
+        if payload.get("response_format"):
+            key_fields["response_format"] = payload["response_format"]
+        canonical = json.dumps(key_fields, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _count(counter: str, value: int = 1):
+        with LlmResponseCache._lock:
+            LlmResponseCache._stats[counter] += value
+
+    @staticmethod
+    def get(cache_key: str) -> Optional[Dict]:
+        """
+        Возвращает закэшированный ответ API (и отмечает его использование).
+
+        :param cache_key: Ключ из make_key.
+        :return: Ответ API в формате JSON или None, если записи нет (или она устарела).
+        """
+        db_helper = DbHelper()
+        try:
+            with db_helper.session() as connection:
+                response = connection.execute(text('''
+                    UPDATE museum.llm_cache
+                    SET hits = hits + 1, last_used_at = now()
+                    WHERE cache_key = :cache_key AND created_at > now() - make_interval(secs => :ttl)
+                    RETURNING response
+                '''), {"cache_key": cache_key, "ttl": LLM_CACHE_TTL}).scalar()
+        except Exception as e:
+            log(f"[LlmResponseCache] ошибка чтения кэша: {e}")
+            LlmResponseCache._count("errors")
+            return None
+        finally:
+            db_helper.close_connection()
+
+        LlmResponseCache._count("hits" if response is not None else "misses")
+        return response
+
+    @staticmethod
+    def put(cache_key: str, model: str, response: Dict):
+        """
+        Сохраняет успешный ответ API в кэш.
+
+        :param cache_key: Ключ из make_key.
+        :param model: Модель (для диагностики).
+        :param response: Ответ API в формате JSON.
+        """
+        if "error" in response:
+            return
+
+        with LlmResponseCache._lock:
+            LlmResponseCache._puts_since_eviction += 1
+            evict = LlmResponseCache._puts_since_eviction >= LLM_CACHE_EVICT_EVERY
+            if evict:
+                LlmResponseCache._puts_since_eviction = 0
+
+        db_helper = DbHelper()
+        try:
+            with db_helper.session() as connection:
+                connection.execute(text('''
+                    INSERT INTO museum.llm_cache (cache_key, model, response)
+                    VALUES (:cache_key, :model, CAST(:response AS jsonb))
+                    ON CONFLICT (cache_key) DO UPDATE SET
+                        response = EXCLUDED.response,
+                        created_at = now(),
+                        last_used_at = now()
+                '''), {"cache_key": cache_key, "model": model, "response": json.dumps(response, ensure_ascii=False)})
+            LlmResponseCache._count("stores")
+            if evict:
+                LlmResponseCache.evict(db_helper)
+        except Exception as e:
+            log(f"[LlmResponseCache] ошибка записи в кэш: {e}")
+            LlmResponseCache._count("errors")
+        finally:
+            db_helper.close_connection()
+
+    @staticmethod
+    def evict(db_helper: Optional[DbHelper] = None) -> int:
+        """
+        Удаляет устаревшие записи и самые давно использованные записи сверх LLM_CACHE_MAX_ENTRIES.
+
+        :param db_helper: Помощник для работы с БД (если не указан, создается новый).
+        :return: Количество удаленных записей.
+        """
+        helper = db_helper or DbHelper()
+        try:
+            with helper.session() as connection:
+                evicted = connection.execute(text('''
+                    DELETE FROM museum.llm_cache
+                    WHERE created_at <= now() - make_interval(secs => :ttl)
+                       OR cache_key IN (
+                           SELECT cache_key FROM museum.llm_cache
+                           ORDER BY last_used_at DESC
+                           OFFSET :max_entries
+                       )
+                '''), {"ttl": LLM_CACHE_TTL, "max_entries": LLM_CACHE_MAX_ENTRIES}).rowcount
+        finally:
+            if db_helper is None:
+                helper.close_connection()
+        if evicted:
+            LlmResponseCache._count("evictions", evicted)
+            log(f"[LlmResponseCache] удалено записей: {evicted}")
+        return evicted
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        """Счетчики кэша процесса (попадания, промахи, записи, вытеснения, ошибки БД)."""
+        with LlmResponseCache._lock:
+            return dict(LlmResponseCache._stats)
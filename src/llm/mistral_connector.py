@@ -1,12 +1,35 @@
+import asyncio
 import os
-import requests
-from typing import Dict, Optional
+import threading
+from typing import Any, Dict, Optional, Tuple
 
+import httpx
+
+from src.llm.llm_response_cache import LlmResponseCache
 from src.utils.logger import log
 
+# Таймауты запросов к API (сек.): установка соединения и ожидание ответа (генерация может быть долгой)
+MISTRAL_CONNECT_TIMEOUT = float(os.getenv("MISTRAL_CONNECT_TIMEOUT", 10))
+MISTRAL_READ_TIMEOUT = float(os.getenv("MISTRAL_READ_TIMEOUT", 120))
+
+# Ограничения пула соединений: всего соединений и сколько из них держать открытыми (keep-alive)
+MISTRAL_MAX_CONNECTIONS = int(os.getenv("MISTRAL_MAX_CONNECTIONS", 20))
+MISTRAL_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MISTRAL_MAX_KEEPALIVE_CONNECTIONS", 10))
+
 
 class MistralConnector:
-    """Класс для интеграции с API Mistral."""
+    """
+    Класс для интеграции с API Mistral.
+
+    HTTP-клиенты общие для всех экземпляров процесса: соединения с API переиспользуются (keep-alive),
+    поэтому создавать MistralConnector на каждый запрос дешево.
+    """
+
+    _client: Optional[httpx.Client] = None
+    # Асинхронный клиент привязан к циклу событий, в котором создан
+    _async_client: Optional[httpx.AsyncClient] = None
+    _async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+    _clients_lock = threading.Lock()
 
     def __init__(
             self,
@@ -49,38 +72,186 @@ class MistralConnector:
         """
         return os.getenv("MISTRAL_API_KEY")
 
+    @staticmethod
+    def _client_options() -> Dict[str, Any]:
+        return {
+            "timeout": httpx.Timeout(MISTRAL_READ_TIMEOUT, connect=MISTRAL_CONNECT_TIMEOUT),
+            "limits": httpx.Limits(
+                max_connections=MISTRAL_MAX_CONNECTIONS,
+                max_keepalive_connections=MISTRAL_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        }
+
+    @staticmethod
+    def _get_client() -> httpx.Client:
+        """Общий синхронный клиент с пулом соединений (создается при первом обращении)."""
+        if MistralConnector._client is None:
+            with MistralConnector._clients_lock:
+                if MistralConnector._client is None:
+                    MistralConnector._client = httpx.Client(**MistralConnector._client_options())
+        return MistralConnector._client
+
+    @staticmethod
+    def _get_async_client() -> httpx.AsyncClient:
+        """
+        Общий асинхронный клиент с пулом соединений для текущего цикла событий.
+        Клиент, созданный в другом цикле, закрывается (его соединения нельзя использовать в текущем цикле).
+        """
+        loop = asyncio.get_running_loop()
+        with MistralConnector._clients_lock:
+            if MistralConnector._async_client is not None and MistralConnector._async_client_loop is loop:
+                return MistralConnector._async_client
+            stale_client, stale_loop = MistralConnector._async_client, MistralConnector._async_client_loop
+            MistralConnector._async_client = httpx.AsyncClient(**MistralConnector._client_options())
+            MistralConnector._async_client_loop = loop
+            client = MistralConnector._async_client
+
+        if stale_client is not None:
+            if stale_loop is not None and stale_loop.is_running():
+                # Прежний цикл работает в другом потоке - закрываем клиент в нем
+                asyncio.run_coroutine_threadsafe(MistralConnector._close_stale_client(stale_client), stale_loop)
+            else:
+                # Прежний цикл остановлен: закрываем клиент в текущем; если цикл уже закрыт,
+                # сокеты его соединений освобождает сборщик мусора
+                loop.create_task(MistralConnector._close_stale_client(stale_client))
+        return client
+
+    @staticmethod
+    async def _close_stale_client(client: httpx.AsyncClient):
+        """Закрывает асинхронный клиент прежнего цикла событий (ошибки закрытия только логируются)."""
+        try:
+            await client.aclose()
+        except Exception as e:
+            log(f"[MistralConnector] не удалось закрыть клиент прежнего цикла событий: {e}")
+
+    @staticmethod
+    def close():
+        """Закрывает синхронный клиент (соединения пула)."""
+        with MistralConnector._clients_lock:
+            if MistralConnector._client is not None:
+                MistralConnector._client.close()
+                MistralConnector._client = None
+
+    @staticmethod
+    async def aclose():
+        """Закрывает асинхронный клиент (соединения пула)."""
+        with MistralConnector._clients_lock:
+            client = MistralConnector._async_client
+            MistralConnector._async_client = None
+            MistralConnector._async_client_loop = None
+        if client is not None:
+            await client.aclose()
+
+    def _prepare_request(
+            self,
+            prompt: str,
+            model: Optional[str],
+            max_tokens: Optional[int],
+            temperature: Optional[float],
+            use_cache: Optional[bool],
+            json_mode: bool,
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Тело запроса к API и ключ кэша ответов (общие для generate_text и agenerate_text).
+
+        :return: Тело запроса и ключ кэша (None, если кэш для запроса не используется).
+        """
+        payload = {
+            "model": model or self.default_model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens or self.default_max_tokens,
+            "temperature": temperature or self.default_temperature,
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        return payload, self._cache_key(payload, use_cache)
+
+    @staticmethod
+    def _parse_response(response: httpx.Response) -> Dict:
+        """
+        Проверяет HTTP-статус ответа и разбирает его JSON.
+
+        :raises httpx.HTTPStatusError: Ответ с ошибкой HTTP.
+        :raises ValueError: Тело ответа - не JSON.
+        """
+        response.raise_for_status()  # Проверка HTTP ошибок
+        log("[MistralConnector] получен ответ...")
+        return response.json()
+
     def generate_text(
             self,
             prompt: str,
             model: Optional[str] = None,
             max_tokens: Optional[int] = None,
             temperature: Optional[float] = None,
+            use_cache: Optional[bool] = None,
+            json_mode: bool = False,
     ) -> Dict:
         """
-        Генерирует текст с использованием API Mistral.
+        Генерирует текст с использованием API Mistral (блокирует вызывающий поток).
 
         :param prompt: Текст запроса.
         :param model: Модель для генерации (если None, используется модель по умолчанию).
         :param max_tokens: Максимальное количество токенов (если None, используется значение по умолчанию).
         :param temperature: Креативность ответа (если None, используется значение по умолчанию).
+        :param use_cache: Использовать кэш ответов LLM (если None - по настройке LLM_CACHE_ENABLED, False - в обход кэша).
+        :param json_mode: Потребовать от модели ответ в виде JSON-объекта (response_format).
         Возвращает Ответ API в формате JSON.
         """
-        payload = {
-            "model": model or self.default_model,
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": max_tokens or self.default_max_tokens,
-            "temperature": temperature or self.default_temperature,
-        }
+        payload, cache_key = self._prepare_request(prompt, model, max_tokens, temperature, use_cache, json_mode)
+        if cache_key is not None:
+            cached = LlmResponseCache.get(cache_key)
+            if cached is not None:
+                log("[MistralConnector] ответ взят из кэша")
+                return cached
 
         try:
             log("[MistralConnector] отправка запроса...")
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
-            response.raise_for_status()  # Проверка HTTP ошибок
-            log("[MistralConnector] получен ответ...")
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            result = self._parse_response(self._get_client().post(self.api_url, headers=self.headers, json=payload))
+        except (httpx.HTTPError, ValueError) as e:
             return {"error": str(e)}
 
+        if cache_key is not None:
+            LlmResponseCache.put(cache_key, payload["model"], result)
+        return result
+
+    async def agenerate_text(
+            self,
+            prompt: str,
+            model: Optional[str] = None,
+            max_tokens: Optional[int] = None,
+            temperature: Optional[float] = None,
+            use_cache: Optional[bool] = None,
+            json_mode: bool = False,
+    ) -> Dict:
+        """
+        Генерирует текст с использованием API Mistral, не блокируя цикл событий.
+        Параметры и формат ответа - как у generate_text.
+        """
+        payload, cache_key = self._prepare_request(prompt, model, max_tokens, temperature, use_cache, json_mode)
+        if cache_key is not None:
+            cached = await asyncio.to_thread(LlmResponseCache.get, cache_key)
+            if cached is not None:
+                log("[MistralConnector] ответ взят из кэша")
+                return cached
+
+        try:
+            log("[MistralConnector] отправка запроса...")
+            client = self._get_async_client()
+            result = self._parse_response(await client.post(self.api_url, headers=self.headers, json=payload))
+        except (httpx.HTTPError, ValueError) as e:
+            return {"error": str(e)}
+
+        if cache_key is not None:
+            await asyncio.to_thread(LlmResponseCache.put, cache_key, payload["model"], result)
+        return result
+
+    @staticmethod
+    def _cache_key(payload: Dict[str, Any], use_cache: Optional[bool]) -> Optional[str]:
+        """Ключ кэша ответов для запроса или None, если кэш для него не используется."""
+        enabled = LlmResponseCache.enabled if use_cache is None else use_cache
+        return LlmResponseCache.make_key(payload) if enabled else None
+
     @staticmethod
     def extract_response_text(api_response: Dict) -> Optional[str]:
         """
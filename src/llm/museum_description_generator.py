@@ -1,66 +1,177 @@
-from typing import List, Dict, Any
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 
 from src.llm.mistral_connector import MistralConnector
+from src.llm.museum_description_store import MuseumDescriptionStore
 from src.utils.logger import log
 
+# Максимальное количество одновременных запросов на генерацию описаний
+DESCRIPTION_CONCURRENCY = int(os.getenv("DESCRIPTION_CONCURRENCY", 5))
+
 
 # Генератор описаний музеев с ацентом на интереах пользователя
 class MuseumDescriptionGenerator:
-    def __init__(self, mistral_connector: MistralConnector):
+    def __init__(self, mistral_connector: MistralConnector, use_store: bool = True):
         """
         Инициализация генератора описаний музеев.
 
         :param mistral_connector: Объект для интеграции с Mistral API.
+        :param use_store: Брать готовые описания из хранилища и сохранять туда новые.
         """
         self.mistral_connector = mistral_connector
+        self.use_store = use_store
+
+
+    @staticmethod
+    def _build_prompt(museum: Dict[str, Any]) -> str:
+        """Запрос к Mistral на описание музея с обоснованием по совпавшим интересам."""
+        return (
+            f"Есть музей: {museum['name']}. "
+            f"Описание музея: {museum['description']}. "
+            f"Адрес музея: {museum['address']}. "
+            f"К этому музею привязаны определенные категории интересов, и среди них с моими интересами совпадают следующие: {museum['matched_interest_names']}. "
+            "Исходя из всех этих данных составьте краткое описание музея с логичным обоснованием, почему, на ваш взгляд, он может меня заинтересовать. "
+            "\n\nФормат итогового текста:\n"
+            "```\n"
+            "'<НАЗВАНИЕ МУЗЕЯ>\n"
+            "Адрес: <адрес музея, строка вплотную прижата к строке с названием>\n\n"
+            "Спустя 2 абзаца - описание музея с обоснованием, почему он может меня заинтересовать'\n"
+            "```\n"
+            "\n\nПример:\n"
+            "'Исторический музей\n"
+            "Адрес: Красная площадь, 1, Москва\n\n"
+            "Поскольку вас интересует история Древней Руси, этот музей предлагает уникальную коллекцию древнерусских рукописей, "
+            "оружия и предметов быта, которые помогут погрузиться в атмосферу тех времен. "
+            "Также, учитывая ваш интерес к XX веку, экспозиции музея включают материалы о ключевых событиях эпохи — "
+            "от революции до Великой Отечественной войны. Отдельного внимания заслуживает раздел народного творчества, "
+            "созданный специально для ценителей традиционной культуры, таких, как вы: здесь представлены народные костюмы, "
+            "глиняная посуда и другие произведения мастеров прошлого. Все эти экспонаты идеально соответствуют вашим увлечениям.'\n\n"
+            "В ответ пришлите готовый текст без сопровождающих комментариев - нужен только составленный текст."
+            "Допустимый размер описания: не более 350 символов (это критически важно!). Основной упор - не на описании, а на соответствии моим интересам - "
+            "его нужно всячески подчеркивать."
+        )
+
+
+    def _describe(self, museum: Dict[str, Any]) -> Optional[str]:
+        """Описание одного музея (None, если получить его не удалось)."""
+        log(f"[MuseumDescriptionGenerator] генерация описания для: {museum['name']}")
+        try:
+            response = self.mistral_connector.generate_text(self._build_prompt(museum), temperature = 0.8)
+            description = self.mistral_connector.extract_response_text(response)
+        except Exception as e:
+            log(f"[MuseumDescriptionGenerator] ошибка генерации описания для {museum['name']}: {e}")
+            return None
+        if description:
+            log("[MuseumDescriptionGenerator] описание успешно сгенерировано!")
+            if self.use_store:
+                MuseumDescriptionStore.put(museum, description, DESCRIPTION_PROMPT_VERSION)
+        return description
 
+    def _stored_descriptions(self, museums: List[Dict[str, Any]]) -> Dict[int, str]:
+        """Готовые описания музеев из хранилища (ID музея -> описание)."""
+        if not self.use_store:
+            return {}
+        return MuseumDescriptionStore.get_many(museums, DESCRIPTION_PROMPT_VERSION)
 
-    def generate_museum_descriptions(self, museums: List[Dict[str, Any]]) -> str:
+    async def _adescribe(self, museum: Dict[str, Any], semaphore: asyncio.Semaphore) -> Optional[str]:
+        """Асинхронное описание одного музея (None, если получить его не удалось)."""
+        async with semaphore:
+            log(f"[MuseumDescriptionGenerator] генерация описания для: {museum['name']}")
+            try:
+                response = await self.mistral_connector.agenerate_text(self._build_prompt(museum), temperature = 0.8)
+                description = self.mistral_connector.extract_response_text(response)
+            except Exception as e:
+                log(f"[MuseumDescriptionGenerator] ошибка генерации описания для {museum['name']}: {e}")
+                return None
+        if description:
+            log("[MuseumDescriptionGenerator] описание успешно сгенерировано!")
+            if self.use_store:
+                await asyncio.to_thread(MuseumDescriptionStore.put, museum, description, DESCRIPTION_PROMPT_VERSION)
+        return description
+
+
+    def generate_museum_descriptions(self, museums: List[Dict[str, Any]],
+                                     concurrency: int = DESCRIPTION_CONCURRENCY) -> str:
         """
         Генерирует красивые описания для каждого музея с помощью Mistral.
+        Готовые описания берутся из хранилища, остальные запросы выполняются параллельно
+        (не больше concurrency одновременно); порядок музеев сохраняется,
+        музеи, для которых описание получить не удалось, пропускаются.
 
         :param museums: Список музеев с информацией (название, описание, адрес, совпадающие интересы).
-        :return: Строка с описаниями всех музеев, разделенными пустой строкой.
+        :param concurrency: Максимальное количество одновременных запросов к Mistral.
+        :return: Строка с описаниями всех музеев, разделенными "|||".
         """
-        descriptions = []  # Список для хранения описаний музеев
+        if not museums:
+            return ""
+        stored = self._stored_descriptions(museums)
+        missing = [museum for museum in museums if museum.get("museum_id") not in stored]
+        generated = {}
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(missing)))) as executor:
+                generated = dict(zip(map(id, missing), executor.map(self._describe, missing)))
+        descriptions = [stored.get(museum.get("museum_id")) or generated.get(id(museum)) for museum in museums]
+        return "|||".join(description for description in descriptions if description)
 
-        for museum in museums:
-            log(f"[MuseumDescriptionGenerator] генерация описания для: {museum['name']}")
-            # Формируем запрос для Mistral
-            prompt = (
-                f"Есть музей: {museum['name']}. "
-                f"Описание музея: {museum['description']}. "
-                f"Адрес музея: {museum['address']}. "
-                f"К этому музею привязаны определенные категории интересов, и среди них с моими интересами совпадают следующие: {museum['matched_interest_names']}. "
-                "Исходя из всех этих данных составьте краткое описание музея с логичным обоснованием, почему, на ваш взгляд, он может меня заинтересовать. "
-                "\n\nФормат итогового текста:\n"
-                "```\n"
-                "'<НАЗВАНИЕ МУЗЕЯ>\n"
-                "Адрес: <адрес музея, строка вплотную прижата к строке с названием>\n\n"
-                "Спустя 2 абзаца - описание музея с обоснованием, почему он может меня заинтересовать'\n"
-                "```\n"
-                "\n\nПример:\n"
-                "'Исторический музей\n"
-                "Адрес: Красная площадь, 1, Москва\n\n"
-                "Поскольку вас интересует история Древней Руси, этот музей предлагает уникальную коллекцию древнерусских рукописей, "
-                "оружия и предметов быта, которые помогут погрузиться в атмосферу тех времен. "
-                "Также, учитывая ваш интерес к XX веку, экспозиции музея включают материалы о ключевых событиях эпохи — "
-                "от революции до Великой Отечественной войны. Отдельного внимания заслуживает раздел народного творчества, "
-                "созданный специально для ценителей традиционной культуры, таких, как вы: здесь представлены народные костюмы, "
-                "глиняная посуда и другие произведения мастеров прошлого. Все эти экспонаты идеально соответствуют вашим увлечениям.'\n\n"
-                "В ответ пришлите готовый текст без сопровождающих комментариев - нужен только составленный текст."
-                "Допустимый размер описания: не более 350 символов (это критически важно!). Основной упор - не на описании, а на соответствии моим интересам - "
-                "его нужно всячески подчеркивать."
-            )
-
-            # Отправляем запрос в Mistral
-            response = self.mistral_connector.generate_text(prompt, temperature = 0.8)
-            description = self.mistral_connector.extract_response_text(response)
 
-            # Если описание успешно получено, добавляем его в список
-            if description:
-                log("[MuseumDescriptionGenerator] описание успешно сгенерировано!")
-                descriptions.append(description)
+    async def astream_museum_descriptions(
+            self,
+            museums: List[Dict[str, Any]],
+            concurrency: int = DESCRIPTION_CONCURRENCY,
+            ordered: bool = False,
+    ) -> AsyncIterator[Tuple[Dict[str, Any], str]]:
+        """
+        Генерирует описания музеев параллельно и отдает их по мере готовности
+        (готовые описания из хранилища - сразу). Музеи, для которых описание получить не удалось, пропускаются.
+
+        :param museums: Список музеев с информацией (название, описание, адрес, совпадающие интересы).
+        :param concurrency: Максимальное количество одновременных запросов к Mistral.
+        :param ordered: Отдавать описания в порядке списка музеев (иначе - в порядке готовности).
+        :return: Асинхронный итератор пар (музей, описание).
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        stored = await asyncio.to_thread(self._stored_descriptions, museums)
+
+        async def describe(museum: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+            if museum.get("museum_id") in stored:
+                return museum, stored[museum["museum_id"]]
+            return museum, await self._adescribe(museum, semaphore)
+
+        tasks = [asyncio.ensure_future(describe(museum)) for museum in museums]
+        try:
+            for next_result in (tasks if ordered else asyncio.as_completed(tasks)):
+                museum, description = await next_result
+                if description:
+                    yield museum, description
+        finally:
+            # Если получатель прекратил чтение, оставшиеся запросы не нужны
+            for task in tasks:
+                task.cancel()
+
+
+    async def agenerate_museum_descriptions(self, museums: List[Dict[str, Any]],
+                                            concurrency: int = DESCRIPTION_CONCURRENCY) -> str:
+        """
+        Асинхронный вариант generate_museum_descriptions (не блокирует цикл событий бота).
+
+        :param museums: Список музеев с информацией (название, описание, адрес, совпадающие интересы).
+        :param concurrency: Максимальное количество одновременных запросов к Mistral.
+        :return: Строка с описаниями всех музеев, разделенными "|||".
+        """
+        descriptions = [
+            description async for _, description in self.astream_museum_descriptions(museums, concurrency, ordered=True)
+        ]
+        return "|||".join(descriptions)
+
 
-        # Возвращаем накопленные описания
-        return "|||".join(descriptions)
\ No newline at end of file
+# Версия шаблона запроса на описание: меняется при любом изменении текста шаблона,
+# поэтому описания, сохраненные для старого шаблона, не используются
+DESCRIPTION_PROMPT_VERSION = hashlib.md5(MuseumDescriptionGenerator._build_prompt({
+    "name": "{name}",
+    "description": "{description}",
+    "address": "{address}",
+    "matched_interest_names": "{matched_interest_names}",
+}).encode("utf-8")).hexdigest()[:12]
@@ -0,0 +1,131 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from src.db.db_helper import DbHelper
+from src.utils.logger import log
+
+
+def interest_key(interest_ids: List[int]) -> str:
+    """Ключ набора интересов: отсортированные ID через запятую (порядок выбора не важен)."""
+    return ",".join(str(interest_id) for interest_id in sorted({int(i) for i in interest_ids}))
+
+
+# Хранилище сгенерированных описаний музеев. Описание зависит только от музея, набора совпавших
+# интересов и шаблона запроса, поэтому ключ - (ID музея, набор ID интересов, версия шаблона).
+# Описание считается устаревшим, если содержимое музея (content_hash) изменилось после генерации.
+class MuseumDescriptionStore:
+    _lock = threading.Lock()
+    _stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def _key_of(museum: Dict[str, Any]) -> Optional[str]:
+        interest_ids = museum.get("matched_interest_ids")
+        if museum.get("museum_id") is None or not interest_ids:
+            return None
+        return interest_key(interest_ids)
+
+    @staticmethod
+    def get_many(museums: List[Dict[str, Any]], prompt_version: str) -> Dict[int, str]:
+        """
+        Возвращает сохраненные актуальные описания музеев одним запросом.
+
+        :param museums: Музеи с ID и совпавшими интересами (museum_id, matched_interest_ids).
+        :param prompt_version: Версия шаблона запроса.
+        :return: ID музея -> описание (для музеев, у которых описание найдено).
+        """
+        keyed = [(museum, MuseumDescriptionStore._key_of(museum)) for museum in museums]
+        keyed = [(int(museum["museum_id"]), key) for museum, key in keyed if key is not None]
+        if not keyed:
+            return {}
+
+        db_helper = DbHelper()
+        try:
+            rows = db_helper.fetch_all('''
+                SELECT d.museum_id, d.description
+                FROM unnest(CAST(:museum_ids AS bigint[]), CAST(:interest_keys AS text[])) AS k(museum_id, interest_key)
+                JOIN museum.museum_description d
+                  ON d.museum_id = k.museum_id AND d.interest_key = k.interest_key AND d.prompt_version = :prompt_version
+                JOIN museum.museum m
+                  ON m.museum_id = d.museum_id AND m.content_hash IS NOT DISTINCT FROM d.content_hash
+            ''', {
+                "museum_ids": [museum_id for museum_id, _ in keyed],
+                "interest_keys": [key for _, key in keyed],
+                "prompt_version": prompt_version,
+            })
+        except Exception as e:
+            log(f"[MuseumDescriptionStore] ошибка чтения описаний: {e}")
+            return {}
+        finally:
+            db_helper.close_connection()
+
+        with MuseumDescriptionStore._lock:
+            MuseumDescriptionStore._stats["hits"] += len(rows)
+            MuseumDescriptionStore._stats["misses"] += len(keyed) - len(rows)
+        return {int(museum_id): description for museum_id, description in rows}
+
+    @staticmethod
+    def put(museum: Dict[str, Any], description: str, prompt_version: str):
+        """
+        Сохраняет описание музея (для текущей версии содержимого музея).
+
+        :param museum: Музей с ID и совпавшими интересами (museum_id, matched_interest_ids).
+        :param description: Сгенерированное описание.
+        :param prompt_version: Версия шаблона запроса.
+        """
+        key = MuseumDescriptionStore._key_of(museum)
+        if key is None or not description:
+            return
+
+        db_helper = DbHelper()
+        try:
+            db_helper.execute_query('''
+                INSERT INTO museum.museum_description (museum_id, interest_key, prompt_version, content_hash, description)
+                SELECT m.museum_id, :interest_key, :prompt_version, m.content_hash, :description
+                FROM museum.museum m
+                WHERE m.museum_id = :museum_id
+                ON CONFLICT (museum_id, interest_key, prompt_version) DO UPDATE SET
+                    content_hash = EXCLUDED.content_hash,
+                    description = EXCLUDED.description,
+                    created_at = now()
+            ''', {
+                "museum_id": int(museum["museum_id"]),
+                "interest_key": key,
+                "prompt_version": prompt_version,
+                "description": description,
+            })
+            with MuseumDescriptionStore._lock:
+                MuseumDescriptionStore._stats["stores"] += 1
+        except Exception as e:
+            log(f"[MuseumDescriptionStore] ошибка сохранения описания: {e}")
+        finally:
+            db_helper.close_connection()
+
+    @staticmethod
+    def purge_stale(prompt_version: str) -> int:
+        """
+        Удаляет описания другой версии шаблона и описания музеев, содержимое которых изменилось.
+
+        :param prompt_version: Текущая версия шаблона запроса.
+        :return: Количество удаленных описаний.
+        """
+        db_helper = DbHelper()
+        try:
+            with db_helper.session() as connection:
+                purged = connection.execute(text('''
+                    DELETE FROM museum.museum_description d
+                    USING museum.museum m
+                    WHERE m.museum_id = d.museum_id
+                      AND (d.prompt_version <> :prompt_version OR m.content_hash IS DISTINCT FROM d.content_hash)
+                '''), {"prompt_version": prompt_version}).rowcount
+        finally:
+            db_helper.close_connection()
+        log(f"[MuseumDescriptionStore] удалено устаревших описаний: {purged}")
+        return purged
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        """Счетчики процесса: найденные и отсутствующие описания, сохраненные описания."""
+        with MuseumDescriptionStore._lock:
+            return dict(MuseumDescriptionStore._stats)
@@ -1,27 +1,57 @@
-from typing import Dict, Any, List
+import json
+import os
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import Connection, text
 
-from src.bot.bot_db_connector import BotDbConnector
 from src.db.db_helper import DbHelper
+from src.db.interest_catalog import InterestCatalog
 from src.llm.mistral_connector import MistralConnector
+from src.search.interest_matcher import InterestMatcher
 from src.utils.logger import log
 
+# Сколько музеев классифицировать одним запросом в пакетном режиме
+LINKER_MUSEUMS_PER_PROMPT = int(os.getenv("LINKER_MUSEUMS_PER_PROMPT", 10))
+
+# Обрамление ответа в блок кода Markdown (```json ... ```)
+CODE_FENCE_PATTERN = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
 
 # Утилита для связывания музеев с интересами
 class MuseumInterestLinker:
-    def __init__(self, mistral_connector: MistralConnector):
+    # Счетчики сопоставления названий из ответов LLM со справочником интересов (общие для процесса)
+    _lock = threading.Lock()
+    _stats = {"names": 0, "resolved": 0, "unresolved": 0}
+    _unresolved_names = Counter()
+
+    def __init__(self, mistral_connector: MistralConnector, before_request: Optional[Callable[[], None]] = None):
         """
         Инициализация связывателя интересов с музеями.
 
         :param mistral_connector: Объект для интеграции с Mistral API.
+        :param before_request: Функция, вызываемая перед каждым запросом к Mistral, в т.ч. повторным
+                               (например, RateLimiter.acquire).
         """
         self.mistral_connector = mistral_connector
+        self.before_request = before_request
+
+    def _generate(self, prompt: str, **kwargs) -> Dict:
+        """Запрос к Mistral (с вызовом before_request)."""
+        if self.before_request is not None:
+            self.before_request()
+        return self.mistral_connector.generate_text(prompt, **kwargs)
 
-    def link_museum_interests(self, museum: Dict[str, Any], interests: List[str]) -> List[str]:
+    def link_museum_interests(self, museum: Dict[str, Any], interests: List[str],
+                              raise_errors: bool = False) -> List[str]:
         """
         Связывает музей с подходящими интересами с помощью Mistral.
 
         :param museum: Данные музея (название, описание).
         :param interests: Полный список интересов.
+        :param raise_errors: Выбрасывать RuntimeError при ошибке API (иначе возвращается пустой список).
         :return: Список подходящих интересов для музея.
         """
         # Формируем запрос для Mistral
@@ -36,7 +66,9 @@ class MuseumInterestLinker:
         log(f"[MuseumInterestLinker] отправляем запрос по музею {museum['name']}")
 
         # Отправляем запрос в Mistral
-        response = self.mistral_connector.generate_text(prompt, temperature = 0.6)
+        response = self._generate(prompt, temperature=0.6)
+        if raise_errors and "error" in response:
+            raise RuntimeError(response["error"])
         linked_interests = self.mistral_connector.extract_response_text(response)
         log(f"[MuseumInterestLinker] linked_interests {linked_interests}")
 
@@ -45,25 +77,203 @@ class MuseumInterestLinker:
             return [interest.strip() for interest in linked_interests.split(",")]
         return []
 
+    @staticmethod
+    def _build_batch_prompt(museums: List[Dict[str, Any]], interests: List[str],
+                            candidates: Optional[Dict[int, List[str]]] = None) -> str:
+        """
+        Запрос на классификацию нескольких музеев с ответом в виде JSON-объекта.
+        Если заданы кандидаты, для каждого музея перечисляются только его возможные интересы.
+        """
+        if candidates is None:
+            museum_lines = "\n".join(
+                f"ID {museum['museum_id']}: {museum['name']}. Описание музея: {museum['description']}"
+                for museum in museums
+            )
+            task = ("Ниже перечислены музеи (ID, название и описание). Для каждого музея выбери из следующего "
+                    f"списка интересов те, которые ему подходят: {', '.join(interests)}. ")
+        else:
+            museum_lines = "\n".join(
+                f"ID {museum['museum_id']}: {museum['name']}. Описание музея: {museum['description']}. "
+                f"Возможные интересы: {', '.join(candidates.get(int(museum['museum_id'])) or interests)}"
+                for museum in museums
+            )
+            task = ("Ниже перечислены музеи (ID, название, описание и возможные интересы). Для каждого музея "
+                    "выбери из его возможных интересов те, которые ему подходят. ")
+        return (
+            f"{task}"
+            "Интерес должен привязываться к музею только в том случае, если этой теме соответствует как минимум "
+            "один зал или памятник, а не отдельный экспонат. "
+            "Ответ верни строго в виде JSON-объекта без дополнительных комментариев: ключ - ID музея (строкой), "
+            "значение - список названий подходящих интересов (пустой список, если подходящих нет). "
+            'Пример: {"12": ["Живопись", "Скульптура"], "15": []}\n\n'
+            f"{museum_lines}"
+        )
 
     @staticmethod
-    def save_linked_interests(museum_id: int, interests: List[str]):
+    def _parse_batch_response(response_text: Optional[str],
+                              museum_ids: List[int]) -> Optional[Dict[int, List[str]]]:
+        """
+        Разбирает ответ модели на пакетный запрос.
+
+        :param response_text: Текст ответа (JSON-объект, возможно в блоке кода или с текстом вокруг).
+        :param museum_ids: ID музеев пакета (ключи с другими ID отбрасываются).
+        :return: ID музея -> список интересов или None, если ответ не удалось разобрать
+                 или в нем нет ни одного музея пакета.
         """
-        Связывает музей с интересами в БД
+        if not response_text:
+            return None
+        cleaned = CODE_FENCE_PATTERN.sub("", response_text.strip())
+        try:
+            data = json.loads(cleaned)
+        except ValueError:
+            # Модель добавила текст вокруг JSON - берем объект от первой до последней фигурной скобки
+            start, end = cleaned.find("{"), cleaned.rfind("}")
+            if start < 0 or end <= start:
+                return None
+            try:
+                data = json.loads(cleaned[start:end + 1])
+            except ValueError:
+                return None
+        if not isinstance(data, dict):
+            return None
+
+        requested = set(museum_ids)
+        result = {}
+        for key, value in data.items():
+            try:
+                museum_id = int(str(key).replace("ID", "").strip())
+            except ValueError:
+                continue
+            if museum_id not in requested:
+                continue
+            if isinstance(value, str):
+                value = value.split(",")
+            if not isinstance(value, list):
+                continue
+            result[museum_id] = [item.strip() for item in value if isinstance(item, str) and item.strip()]
+        return result or None
 
-        :param museum_id: ID музея.
-        :param interests: Список интересов для связывания.
+    def link_museums_interests(
+            self, museums: List[Dict[str, Any]], interests: List[str],
+            candidates: Optional[Dict[int, List[str]]] = None,
+    ) -> Tuple[Dict[int, List[str]], Dict[int, str]]:
         """
+        Связывает несколько музеев с интересами одним запросом к Mistral (ответ в формате JSON).
+        Если ответ не удалось разобрать, пакет делится пополам и запрашивается повторно;
+        музеи, пропущенные в ответе, запрашиваются отдельным пакетом. Пакет из одного музея
+        запрашивается обычным (текстовым) запросом. Ошибка одного из запросов не отменяет
+        результаты уже выполненных: она относится только к музеям этого запроса.
+
+        :param museums: Данные музеев (ID, название, описание).
+        :param interests: Полный список интересов.
+        :param candidates: ID музея -> короткий список возможных интересов (например, от лексического
+                           связывания); для остальных музеев используется полный список.
+        :return: ID музея -> список подходящих интересов (для музеев, запрос по которым удался)
+                 и ID музея -> текст ошибки (для остальных).
+        """
+        if not museums:
+            return {}, {}
+        museum_ids = [int(museum["museum_id"]) for museum in museums]
+        if len(museums) == 1:
+            museum_interests = (candidates or {}).get(museum_ids[0]) or interests
+            try:
+                return {museum_ids[0]: self.link_museum_interests(museums[0], museum_interests, raise_errors=True)}, {}
+            except Exception as e:
+                return {}, {museum_ids[0]: str(e)}
+
+        log(f"[MuseumInterestLinker] отправляем пакетный запрос по музеям {museum_ids}")
+        try:
+            response = self._generate(
+                self._build_batch_prompt(museums, interests, candidates), temperature=0.6, json_mode=True
+            )
+        except Exception as e:
+            response = {"error": str(e)}
+        if "error" in response:
+            log(f"[MuseumInterestLinker] ошибка пакетного запроса: {response['error']}")
+            return {}, {museum_id: str(response["error"]) for museum_id in museum_ids}
+
+        linked = self._parse_batch_response(self.mistral_connector.extract_response_text(response), museum_ids)
+        if linked is None:
+            middle = len(museums) // 2
+            log(f"[MuseumInterestLinker] некорректный ответ на пакет из {len(museums)} музеев, "
+                f"повторяем частями по {middle} и {len(museums) - middle}")
+            linked, errors = self.link_museums_interests(museums[:middle], interests, candidates)
+            second_linked, second_errors = self.link_museums_interests(museums[middle:], interests, candidates)
+            linked.update(second_linked)
+            errors.update(second_errors)
+            return linked, errors
+
+        errors = {}
+        missing = [museum for museum in museums if int(museum["museum_id"]) not in linked]
+        if missing:
+            log(f"[MuseumInterestLinker] в ответе нет музеев {[int(m['museum_id']) for m in missing]}, "
+                f"запрашиваем повторно")
+            missing_linked, errors = self.link_museums_interests(missing, interests, candidates)
+            linked.update(missing_linked)
+        return linked, errors
+
+    @staticmethod
+    def resolve_interests(interests: List[str]) -> List[int]:
+        """
+        Сопоставляет названия интересов из ответа LLM со справочником (с учетом регистра, ё,
+        пунктуации и опечаток) и учитывает ненайденные названия в счетчиках.
+
+        :param interests: Названия интересов.
+        :return: ID найденных интересов (без повторов).
+        """
+        interest_ids, unresolved = InterestCatalog.resolve_ids(interests)
+        with MuseumInterestLinker._lock:
+            MuseumInterestLinker._stats["names"] += len(interest_ids) + len(unresolved)
+            MuseumInterestLinker._stats["resolved"] += len(interest_ids)
+            MuseumInterestLinker._stats["unresolved"] += len(unresolved)
+            MuseumInterestLinker._unresolved_names.update(unresolved)
+        if unresolved:
+            log(f"[MuseumInterestLinker] не найдены в справочнике интересы: {unresolved}")
+        return interest_ids
+
+    @staticmethod
+    def save_linked_interests(links: Dict[int, List[int]], connection: Optional[Connection] = None):
+        """
+        Связывает музеи с интересами в БД одним многострочным запросом.
+
+        :param links: ID музея -> ID интересов (см. resolve_interests).
+        :param connection: Открытая транзакция, в которой нужно записать связи вместе с другими данными.
+                           Если не указана, связи записываются в отдельной транзакции и сразу обновляется
+                           индекс подбора музеев; иначе индекс обновляет вызывающий после фиксации транзакции.
+        """
+        museum_ids, interest_ids = [], []
+        for museum_id, museum_interest_ids in links.items():
+            for interest_id in museum_interest_ids:
+                museum_ids.append(int(museum_id))
+                interest_ids.append(int(interest_id))
+        if not museum_ids:
+            return
+
+        query = text('''
+            INSERT INTO museum.museum_interest (museum_id, interest_id)
+            SELECT * FROM unnest(CAST(:museum_ids AS bigint[]), CAST(:interest_ids AS bigint[]))
+            ON CONFLICT DO NOTHING
+        ''')
+        params = {"museum_ids": museum_ids, "interest_ids": interest_ids}
+        if connection is not None:
+            connection.execute(query, params)
+            return
+
         db_helper = DbHelper()
         try:
-            for interest in interests:
-                interest_id = BotDbConnector.get_interest_id(interest)
-                if interest_id:
-                    query = '''
-                        INSERT INTO museum.museum_interest (museum_id, interest_id)
-                        VALUES (:museum_id, :interest_id)
-                        ON CONFLICT DO NOTHING;
-                    '''
-                    db_helper.execute_query(query, {"museum_id": museum_id, "interest_id": int(interest_id)})
+            with db_helper.session() as own_connection:
+                own_connection.execute(query, params)
         finally:
-            db_helper.close_connection()
\ No newline at end of file
+            db_helper.close_connection()
+        # Обновляем индекс подбора музеев
+        for museum_id, museum_interest_ids in links.items():
+            if museum_interest_ids:
+                InterestMatcher.update_museum_interests(museum_id, museum_interest_ids)
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Счетчики процесса: названия из ответов LLM, найденные и ненайденные в справочнике (с частыми примерами)."""
+        with MuseumInterestLinker._lock:
+            stats = dict(MuseumInterestLinker._stats)
+            stats["top_unresolved"] = MuseumInterestLinker._unresolved_names.most_common(10)
+        return stats
@@ -0,0 +1,36 @@
+import re
+from typing import Dict
+
+# Сокращения и разговорные названия городов (в нормализованном виде)
+CITY_ALIASES: Dict[str, str] = {
+    "спб": "санкт петербург",
+    "питер": "санкт петербург",
+    "петербург": "санкт петербург",
+    "мск": "москва",
+    "екб": "екатеринбург",
+    "екат": "екатеринбург",
+    "нн": "нижний новгород",
+    "нижний": "нижний новгород",
+    "нск": "новосибирск",
+    "новосиб": "новосибирск",
+}
+
+# Слова-приставки перед названием города ("г. Москва", "город Казань")
+_CITY_PREFIXES = ("г", "гор", "город")
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize_city(value: str) -> str:
+    """
+    Приводит название города к нормализованному виду: нижний регистр, ё -> е,
+    пунктуация и дефисы -> пробелы, без приставки "г."/"город", с раскрытыми сокращениями.
+
+    :param value: Название города, введенное пользователем или взятое из БД.
+    :return: Нормализованное название (пустая строка, если названия нет).
+    """
+    normalized = (value or "").lower().replace("ё", "е")
+    words = _NON_WORD_RE.sub(" ", normalized).split()
+    if len(words) > 1 and words[0] in _CITY_PREFIXES:
+        words = words[1:]
+    normalized = " ".join(words)
+    return CITY_ALIASES.get(normalized, normalized)
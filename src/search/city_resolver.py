@@ -0,0 +1,147 @@
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from src.search.city_names import normalize_city
+from src.search.museum_catalog import MuseumCatalog, city_key
+from src.utils.logger import log
+from src.utils.text_similarity import levenshtein
+
+# Минимальная доля общих триграмм, при которой город считается кандидатом
+MIN_TRIGRAM_SIMILARITY = 0.3
+# Сколько лучших по триграммам кандидатов проверять расстоянием Левенштейна
+MAX_FUZZY_CANDIDATES = 5
+
+
+def _trigrams(value: str) -> List[str]:
+    padded = f"  {value} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+# Результат распознавания города
+class CityMatch:
+    __slots__ = ("city_id", "name", "key", "exact")
+
+    def __init__(self, city_id: int, name: str, key: str, exact: bool):
+        self.city_id = city_id
+        # Название города в написании каталога
+        self.name = name
+        # Ключ раздела города в каталоге и индексах (нормализованное название, см. city_key)
+        self.key = key
+        # False, если город найден с учетом опечаток
+        self.exact = exact
+
+    def __repr__(self):
+        return f"CityMatch({self.city_id}, {self.name!r}, exact={self.exact})"
+
+
+# Снимок индекса городов (после построения не изменяется)
+class _CityIndexSnapshot:
+    __slots__ = ("names", "keys", "normalized", "trigram_counts", "by_normalized", "postings")
+
+    def __init__(self, cities: List[str]):
+        self.names: List[str] = []
+        self.keys: List[str] = []
+        self.normalized: List[str] = []
+        self.trigram_counts: List[int] = []
+        self.by_normalized: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = {}
+        for name in sorted(cities):
+            normalized = normalize_city(name)
+            if not normalized or normalized in self.by_normalized:
+                continue
+            city_id = len(self.names)
+            self.names.append(name)
+            self.keys.append(city_key(name))
+            self.normalized.append(normalized)
+            self.by_normalized[normalized] = city_id
+            trigrams = set(_trigrams(normalized))
+            self.trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.postings.setdefault(trigram, []).append(city_id)
+
+
+# Распознавание города по вводу пользователя: нормализация, точный поиск по нормализованному
+# названию и, если он не удался, поиск с опечатками по триграммному индексу с проверкой
+# расстоянием Левенштейна. Индекс строится по городам каталога музеев.
+class CityResolver:
+    _snapshot: Optional[_CityIndexSnapshot] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def load(force: bool = False):
+        """
+        Строит индекс по городам каталога музеев.
+
+        :param force: Перестроить индекс, даже если он уже построен.
+        """
+        if CityResolver._snapshot is not None and not force:
+            return
+
+        with CityResolver._lock:
+            if CityResolver._snapshot is not None and not force:
+                return
+            CityResolver._snapshot = _CityIndexSnapshot(MuseumCatalog.cities())
+            log(f"[CityResolver] индекс городов построен: {len(CityResolver._snapshot.names)}")
+
+    @staticmethod
+    def refresh():
+        """Перестраивает индекс городов."""
+        CityResolver.load(force=True)
+
+    @staticmethod
+    def enable_hot_reload():
+        """Перестраивает индекс после каждой перезагрузки каталога музеев."""
+        MuseumCatalog.add_reload_callback(CityResolver.refresh)
+
+    @staticmethod
+    def _get_snapshot() -> _CityIndexSnapshot:
+        if CityResolver._snapshot is None:
+            CityResolver.load()
+        return CityResolver._snapshot
+
+    @staticmethod
+    def resolve(value: str) -> Optional[CityMatch]:
+        """
+        Распознает город по вводу пользователя.
+
+        :param value: Введенное название города ("спб", "г. Москва", "Санкт Петербург", "Казнь" и т.п.).
+        :return: Найденный город или None, если подходящего города в каталоге нет.
+        """
+        snapshot = CityResolver._get_snapshot()
+        normalized = normalize_city(value)
+        if not normalized:
+            return None
+
+        city_id = snapshot.by_normalized.get(normalized)
+        if city_id is not None:
+            return CityMatch(city_id, snapshot.names[city_id], snapshot.keys[city_id], exact=True)
+
+        # Кандидаты - города с наибольшей долей общих триграмм (коэффициент Дайса)
+        query_trigrams = set(_trigrams(normalized))
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(snapshot.postings.get(trigram, ()))
+        scored = []
+        for candidate_id, count in shared.items():
+            similarity = 2 * count / (len(query_trigrams) + snapshot.trigram_counts[candidate_id])
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored.append((similarity, candidate_id))
+        scored.sort(reverse=True)
+
+        # Допускаем примерно одну опечатку на четыре символа
+        max_distance = max(1, len(normalized) // 4)
+        best = None
+        for _, candidate_id in scored[:MAX_FUZZY_CANDIDATES]:
+            distance = levenshtein(normalized, snapshot.normalized[candidate_id], max_distance)
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, candidate_id)
+        if best is None:
+            return None
+        city_id = best[1]
+        return CityMatch(city_id, snapshot.names[city_id], snapshot.keys[city_id], exact=False)
+
+    @staticmethod
+    def cities() -> List[str]:
+        """Возвращает названия городов индекса (в написании каталога)."""
+        return list(CityResolver._get_snapshot().names)
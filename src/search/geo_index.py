@@ -0,0 +1,152 @@
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.search.museum_catalog import MuseumCatalog
+from src.utils.logger import log
+
+# Радиус Земли (км) и длина градуса меридиана (км)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# Размер ячейки сетки в градусах (0.05° - около 5.5 км по широте)
+GEO_CELL_DEGREES = 0.05
+
+# Радиус поиска ближайших музеев по умолчанию (км)
+GEO_SEARCH_RADIUS_KM = float(os.getenv("GEO_SEARCH_RADIUS_KM", 25))
+
+
+def haversine_km(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Расстояния (км) от точки до массива точек по формуле гаверсинусов.
+
+    :param latitude: Широта точки (градусы).
+    :param longitude: Долгота точки (градусы).
+    :param latitudes: Широты точек (радианы).
+    :param longitudes: Долготы точек (радианы).
+    """
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    a = np.sin((latitudes - lat) / 2) ** 2 + math.cos(lat) * np.cos(latitudes) * np.sin((longitudes - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# Снимок пространственного индекса: точки отсортированы по ячейкам сетки,
+# ячейка -> диапазон строк в массивах (после построения не изменяется)
+class _GeoIndexSnapshot:
+    __slots__ = ("museum_ids", "latitudes", "longitudes", "cells")
+
+    def __init__(self, points: List[Tuple[int, float, float]]):
+        museum_ids = np.array([point[0] for point in points], dtype=np.int64)
+        latitudes = np.array([point[1] for point in points], dtype=np.float64)
+        longitudes = np.array([point[2] for point in points], dtype=np.float64)
+        cell_lat = np.floor(latitudes / GEO_CELL_DEGREES).astype(np.int64)
+        cell_lon = np.floor(longitudes / GEO_CELL_DEGREES).astype(np.int64)
+
+        order = np.lexsort((cell_lon, cell_lat))
+        self.museum_ids = museum_ids[order]
+        self.latitudes = np.radians(latitudes[order])
+        self.longitudes = np.radians(longitudes[order])
+        cell_lat, cell_lon = cell_lat[order], cell_lon[order]
+
+        self.cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        if len(points):
+            bounds = np.flatnonzero((np.diff(cell_lat) != 0) | (np.diff(cell_lon) != 0)) + 1
+            starts = np.concatenate(([0], bounds))
+            ends = np.concatenate((bounds, [len(points)]))
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self.cells[(int(cell_lat[start]), int(cell_lon[start]))] = (start, end)
+
+    def candidate_rows(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Строки точек из ячеек, пересекающих квадрат вокруг точки со стороной 2 * radius_km."""
+        delta_lat = radius_km / KM_PER_DEGREE
+        delta_lon = min(360.0, delta_lat / max(math.cos(math.radians(latitude)), 1e-6))
+        # Окрестность пересекает полюс или 180-й меридиан - проще проверить все точки
+        if abs(latitude) + delta_lat >= 90 or abs(longitude) + delta_lon >= 180:
+            return np.arange(len(self.museum_ids))
+
+        lat_range = range(math.floor((latitude - delta_lat) / GEO_CELL_DEGREES),
+                          math.floor((latitude + delta_lat) / GEO_CELL_DEGREES) + 1)
+        lon_range = range(math.floor((longitude - delta_lon) / GEO_CELL_DEGREES),
+                          math.floor((longitude + delta_lon) / GEO_CELL_DEGREES) + 1)
+        # Ячеек в окрестности больше, чем заполненных ячеек - перебираем заполненные
+        if len(lat_range) * len(lon_range) > len(self.cells):
+            slices = [bounds for (cell_lat, cell_lon), bounds in self.cells.items()
+                      if cell_lat in lat_range and cell_lon in lon_range]
+        else:
+            slices = [self.cells[(cell_lat, cell_lon)] for cell_lat in lat_range for cell_lon in lon_range
+                      if (cell_lat, cell_lon) in self.cells]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end) for start, end in slices])
+
+
+# Пространственный индекс музеев (равномерная сетка по широте и долготе поверх массивов NumPy).
+# Строится по музеям каталога, у которых есть координаты, и перестраивается вместе с каталогом.
+class GeoIndex:
+    _snapshot: Optional[_GeoIndexSnapshot] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def load(force: bool = False):
+        """
+        Строит индекс по координатам музеев каталога.
+
+        :param force: Перестроить индекс, даже если он уже построен.
+        """
+        if GeoIndex._snapshot is not None and not force:
+            return
+
+        with GeoIndex._lock:
+            if GeoIndex._snapshot is not None and not force:
+                return
+            points = [
+                (record.museum_id, record.latitude, record.longitude)
+                for record in MuseumCatalog.all_records()
+                if record.latitude is not None and record.longitude is not None
+            ]
+            GeoIndex._snapshot = _GeoIndexSnapshot(points)
+            log(f"[GeoIndex] индекс построен: музеев с координатами {len(points)}, "
+                f"ячеек {len(GeoIndex._snapshot.cells)}")
+
+    @staticmethod
+    def refresh():
+        """Перестраивает индекс."""
+        GeoIndex.load(force=True)
+
+    @staticmethod
+    def enable_hot_reload():
+        """Перестраивает индекс после каждой перезагрузки каталога музеев."""
+        MuseumCatalog.add_reload_callback(GeoIndex.refresh)
+
+    @staticmethod
+    def _get_snapshot() -> _GeoIndexSnapshot:
+        if GeoIndex._snapshot is None:
+            GeoIndex.load()
+        return GeoIndex._snapshot
+
+    @staticmethod
+    def nearest(latitude: float, longitude: float, k: int = 10,
+                radius_km: float = GEO_SEARCH_RADIUS_KM) -> List[Tuple[int, float]]:
+        """
+        Находит ближайшие к точке музеи.
+
+        :param latitude: Широта (градусы).
+        :param longitude: Долгота (градусы).
+        :param k: Максимальное количество музеев в результате.
+        :param radius_km: Радиус поиска (км).
+        :return: Список (ID музея, расстояние в км), отсортированный по возрастанию расстояния.
+        """
+        snapshot = GeoIndex._get_snapshot()
+        rows = snapshot.candidate_rows(latitude, longitude, radius_km)
+        if rows.size == 0 or k <= 0:
+            return []
+
+        distances = haversine_km(latitude, longitude, snapshot.latitudes[rows], snapshot.longitudes[rows])
+        within = np.flatnonzero(distances <= radius_km)
+        if within.size > k:
+            within = within[np.argpartition(distances[within], k - 1)[:k]]
+        within = within[np.argsort(distances[within], kind="stable")]
+        return [(int(snapshot.museum_ids[rows[i]]), float(distances[i])) for i in within.tolist()]
@@ -0,0 +1,223 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.db.db_helper import DbHelper
+from src.db.db_notifications import DbNotificationListener
+from src.db.interest_catalog import InterestCatalog
+from src.search.museum_catalog import MUSEUM_CATALOG_CHANNEL, MuseumCatalog, city_key
+from src.utils.background_reloader import BackgroundReloader
+from src.utils.logger import log
+
+
+# Музеи одного города: ID, названия и битовые маски интересов (по строке на музей)
+class _CityPartition:
+    __slots__ = ("museum_ids", "masks", "name_order")
+
+    def __init__(self, museum_ids: np.ndarray, masks: np.ndarray, name_order: np.ndarray):
+        self.museum_ids = museum_ids
+        self.masks = masks
+        # Позиция музея в алфавитном порядке названий (для сортировки при равном числе совпадений)
+        self.name_order = name_order
+
+
+# Снимок индекса (после построения не изменяется, обновления подменяют его целиком)
+class _MatcherSnapshot:
+    __slots__ = ("bit_of_interest", "interest_of_bit", "words", "partitions", "location")
+
+    def __init__(self, interest_ids: List[int]):
+        self.interest_of_bit = np.array(sorted(interest_ids), dtype=np.int64)
+        self.bit_of_interest = {int(interest_id): bit for bit, interest_id in enumerate(self.interest_of_bit)}
+        self.words = max(1, (len(self.interest_of_bit) + 63) // 64)
+        self.partitions: Dict[str, _CityPartition] = {}
+        # ID музея -> (ключ города, строка в разделе)
+        self.location: Dict[int, Tuple[str, int]] = {}
+
+    def mask_of(self, interest_ids) -> np.ndarray:
+        mask = np.zeros(self.words, dtype=np.uint64)
+        for interest_id in interest_ids:
+            bit = self.bit_of_interest.get(int(interest_id))
+            if bit is not None:
+                mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return mask
+
+    def interests_of(self, mask: np.ndarray) -> List[int]:
+        bits = np.flatnonzero(np.unpackbits(mask.view(np.uint8), bitorder="little"))
+        return self.interest_of_bit[bits].tolist()
+
+
+# Движок подбора музеев по интересам: интересы каждого музея хранятся битовой маской
+# (по биту на интерес из справочника), музеи разбиты по городам. Подбор для пользователя -
+# одна векторная операция AND + popcount по всем музеям города.
+class InterestMatcher:
+    _snapshot: Optional[_MatcherSnapshot] = None
+    _lock = threading.Lock()
+    _reloader: Optional[BackgroundReloader] = None
+
+    @staticmethod
+    def load(force: bool = False):
+        """
+        Строит индекс по всем музеям каталога и их связям с интересами.
+
+        :param force: Перестроить индекс, даже если он уже построен.
+        """
+        if InterestMatcher._snapshot is not None and not force:
+            return
+
+        with InterestMatcher._lock:
+            if InterestMatcher._snapshot is not None and not force:
+                return
+            museums = [(record.museum_id, record.name, record.city) for record in MuseumCatalog.all_records()]
+            db_helper = DbHelper()
+            try:
+                links = db_helper.fetch_all('SELECT museum_id, interest_id FROM museum.museum_interest')
+            finally:
+                db_helper.close_connection()
+            InterestMatcher._snapshot = InterestMatcher._build(museums, links)
+            log(f"[InterestMatcher] индекс построен: музеев {len(museums)}, связей {len(links)}, "
+                f"городов {len(InterestMatcher._snapshot.partitions)}")
+
+    @staticmethod
+    def _build(museums, links) -> _MatcherSnapshot:
+        snapshot = _MatcherSnapshot(InterestCatalog.all_ids())
+
+        interests_by_museum: Dict[int, List[int]] = {}
+        for museum_id, interest_id in links:
+            interests_by_museum.setdefault(int(museum_id), []).append(int(interest_id))
+
+        museums_by_city: Dict[str, List[Tuple[int, str]]] = {}
+        for museum_id, name, city in museums:
+            museums_by_city.setdefault(city_key(city), []).append((int(museum_id), name or ""))
+
+        for key, city_museums in museums_by_city.items():
+            museum_ids = np.array([museum_id for museum_id, _ in city_museums], dtype=np.int64)
+            names = [name for _, name in city_museums]
+            masks = np.zeros((len(city_museums), snapshot.words), dtype=np.uint64)
+            for row, museum_id in enumerate(museum_ids.tolist()):
+                masks[row] = snapshot.mask_of(interests_by_museum.get(museum_id, ()))
+                snapshot.location[museum_id] = (key, row)
+            name_order = np.empty(len(names), dtype=np.int64)
+            name_order[np.argsort(np.array(names, dtype=object), kind="stable")] = np.arange(len(names))
+            snapshot.partitions[key] = _CityPartition(museum_ids, masks, name_order)
+        return snapshot
+
+    @staticmethod
+    def refresh():
+        """Перестраивает индекс из БД."""
+        InterestMatcher.load(force=True)
+
+    @staticmethod
+    def enable_hot_reload():
+        """
+        Перестраивает индекс после перезагрузки каталога музеев и при изменении
+        связей музеев с интересами в других процессах (до запуска DbNotificationListener).
+        """
+        InterestMatcher._reloader = BackgroundReloader("InterestMatcher", InterestMatcher.refresh)
+        MuseumCatalog.add_reload_callback(InterestMatcher.refresh)
+        DbNotificationListener.subscribe(MUSEUM_CATALOG_CHANNEL, InterestMatcher._on_notification)
+
+    @staticmethod
+    def _on_notification(payload: Optional[str]):
+        # Изменения самих музеев обрабатываются через перезагрузку каталога
+        if payload == "museum_interest":
+            InterestMatcher._reloader.request()
+
+    @staticmethod
+    def _get_snapshot() -> _MatcherSnapshot:
+        if InterestMatcher._snapshot is None:
+            InterestMatcher.load()
+        return InterestMatcher._snapshot
+
+    @staticmethod
+    def update_museum_interests(museum_id: int, interest_ids: List[int]):
+        """
+        Добавляет интересы музею в индексе (после записи связей в БД).
+
+        :param museum_id: ID музея.
+        :param interest_ids: ID привязанных интересов.
+        """
+        with InterestMatcher._lock:
+            snapshot = InterestMatcher._snapshot
+            if snapshot is None or int(museum_id) not in snapshot.location:
+                return
+            key, row = snapshot.location[int(museum_id)]
+            partition = snapshot.partitions[key]
+            # Копируем маски раздела, чтобы параллельные читатели видели согласованное состояние
+            masks = partition.masks.copy()
+            masks[row] |= snapshot.mask_of(interest_ids)
+            updated = _CityPartition(partition.museum_ids, masks, partition.name_order)
+            snapshot.partitions = {**snapshot.partitions, key: updated}
+
+    @staticmethod
+    def rank(city: str, interest_ids: List[int], k: int = 10,
+             museum_ids: Optional[List[int]] = None) -> List[Dict[str, object]]:
+        """
+        Подбирает музеи города по интересам пользователя.
+
+        :param city: Город.
+        :param interest_ids: ID интересов пользователя.
+        :param k: Максимальное количество музеев в результате.
+        :param museum_ids: Необязательный список ID музеев-кандидатов (остальные музеи города не учитываются).
+        :return: Список {museum_id, matched_interest_ids, matched_interest_names, matched_interest_count},
+                 отсортированный по убыванию числа совпадений и по названию.
+        """
+        snapshot = InterestMatcher._get_snapshot()
+        partition = snapshot.partitions.get(city_key(city))
+        if partition is None or not interest_ids:
+            return []
+
+        user_mask = snapshot.mask_of(interest_ids)
+        matched = partition.masks & user_mask
+        counts = np.bitwise_count(matched).sum(axis=1, dtype=np.int64)
+        if museum_ids is not None:
+            counts = np.where(np.isin(partition.museum_ids, np.asarray(museum_ids, dtype=np.int64)), counts, 0)
+
+        candidates = np.flatnonzero(counts)
+        if candidates.size == 0:
+            return []
+        if candidates.size > k:
+            # Отсекаем заведомо худших кандидатов, не сортируя весь город
+            threshold = np.partition(counts[candidates], candidates.size - k)[candidates.size - k]
+            candidates = candidates[counts[candidates] >= threshold]
+        order = candidates[np.lexsort((partition.name_order[candidates], -counts[candidates]))][:k]
+
+        return [
+            InterestMatcher._match_result(snapshot, int(partition.museum_ids[row]), matched[row], int(counts[row]))
+            for row in order.tolist()
+        ]
+
+    @staticmethod
+    def rank_museums(museum_ids: List[int], interest_ids: List[int], k: int = 10) -> List[Dict[str, object]]:
+        """
+        Подбирает музеи из заданного списка (например, ближайших к пользователю) по интересам.
+        Музеи могут быть из разных городов.
+
+        :param museum_ids: ID музеев-кандидатов в порядке предпочтения (например, по расстоянию).
+        :param interest_ids: ID интересов пользователя.
+        :param k: Максимальное количество музеев в результате.
+        :return: Список в формате rank(), отсортированный по убыванию числа совпадений
+                 и по порядку во входном списке.
+        """
+        snapshot = InterestMatcher._get_snapshot()
+        known = [int(museum_id) for museum_id in museum_ids if int(museum_id) in snapshot.location]
+        if not known or not interest_ids:
+            return []
+
+        masks = np.stack([
+            snapshot.partitions[key].masks[row] for key, row in (snapshot.location[museum_id] for museum_id in known)
+        ])
+        matched = masks & snapshot.mask_of(interest_ids)
+        counts = np.bitwise_count(matched).sum(axis=1, dtype=np.int64)
+        order = [row for row in np.argsort(-counts, kind="stable").tolist() if counts[row] > 0][:k]
+        return [InterestMatcher._match_result(snapshot, known[row], matched[row], int(counts[row])) for row in order]
+
+    @staticmethod
+    def _match_result(snapshot: _MatcherSnapshot, museum_id: int, matched: np.ndarray, count: int) -> Dict[str, object]:
+        matched_ids = snapshot.interests_of(matched)
+        return {
+            "museum_id": museum_id,
+            "matched_interest_ids": matched_ids,
+            "matched_interest_names": ", ".join(InterestCatalog.get_names(matched_ids)),
+            "matched_interest_count": count,
+        }
@@ -0,0 +1,186 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.db.db_helper import DbHelper
+from src.db.db_notifications import DbNotificationListener
+from src.search.city_names import normalize_city
+from src.utils.background_reloader import BackgroundReloader
+from src.utils.logger import log
+
+# Канал NOTIFY, в который триггеры museum.museum и museum.museum_interest пишут имя измененной таблицы
+MUSEUM_CATALOG_CHANNEL = "museum_catalog"
+
+
+def city_key(city: str) -> str:
+    """
+    Ключ города для разбиения музеев: нормализованное название, поэтому варианты написания
+    одного города ("Санкт-Петербург", "Санкт Петербург", "г. Санкт-Петербург") попадают в один раздел.
+    """
+    return normalize_city(city)
+
+
+# Компактная запись о музее
+class MuseumRecord:
+    __slots__ = ("museum_id", "name", "description", "city", "address", "content_hash", "latitude", "longitude")
+
+    def __init__(self, museum_id: int, name: str, description: str, city: str, address: str, content_hash: str,
+                 latitude: Optional[float] = None, longitude: Optional[float] = None):
+        self.museum_id = museum_id
+        self.name = name
+        self.description = description
+        self.city = city
+        self.address = address
+        self.content_hash = content_hash
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь в формате, который возвращали запросы к БД (museum_id, name, description, city, address)."""
+        return {
+            "museum_id": self.museum_id,
+            "name": self.name,
+            "description": self.description,
+            "city": self.city,
+            "address": self.address,
+        }
+
+
+# Снимок каталога (после построения не изменяется)
+class _MuseumCatalogSnapshot:
+    __slots__ = ("by_id", "by_city", "city_ids")
+
+    def __init__(self, records: List[MuseumRecord]):
+        self.by_id: Dict[int, MuseumRecord] = {record.museum_id: record for record in records}
+        by_city: Dict[str, List[MuseumRecord]] = {}
+        for record in records:
+            by_city.setdefault(city_key(record.city), []).append(record)
+        self.by_city: Dict[str, Tuple[MuseumRecord, ...]] = {key: tuple(items) for key, items in by_city.items()}
+        # ID музеев по городам (для выборок без обращения к записям)
+        self.city_ids: Dict[str, np.ndarray] = {
+            key: np.array([record.museum_id for record in items], dtype=np.int64)
+            for key, items in self.by_city.items()
+        }
+
+
+# Каталог музеев в памяти, разбитый по городам. Строится при старте и перестраивается
+# в фоне при изменениях в БД; новый снимок подменяет старый целиком, поэтому запросы
+# никогда не видят частично построенный каталог.
+class MuseumCatalog:
+    _snapshot: Optional[_MuseumCatalogSnapshot] = None
+    _lock = threading.Lock()
+    _reload_callbacks: List[Callable[[], None]] = []
+    _reloader: Optional[BackgroundReloader] = None
+
+    @staticmethod
+    def load(force: bool = False):
+        """
+        Загружает каталог музеев из БД.
+
+        :param force: Перезагрузить каталог, даже если он уже загружен.
+        """
+        if MuseumCatalog._snapshot is not None and not force:
+            return
+
+        with MuseumCatalog._lock:
+            if MuseumCatalog._snapshot is not None and not force:
+                return
+            db_helper = DbHelper()
+            try:
+                rows = db_helper.fetch_all('''
+                    SELECT museum_id, name, description, city, address, content_hash, latitude, longitude
+                    FROM museum.museum
+                ''')
+            finally:
+                db_helper.close_connection()
+            MuseumCatalog._snapshot = _MuseumCatalogSnapshot([MuseumRecord(*row) for row in rows])
+            log(f"[MuseumCatalog] загружено музеев: {len(rows)}, городов: {len(MuseumCatalog._snapshot.by_city)}")
+
+        for callback in MuseumCatalog._reload_callbacks:
+            callback()
+
+    @staticmethod
+    def refresh():
+        """Перезагружает каталог из БД (в текущем потоке)."""
+        MuseumCatalog.load(force=True)
+
+    @staticmethod
+    def add_reload_callback(callback: Callable[[], None]):
+        """Регистрирует функцию, вызываемую после каждой перезагрузки каталога."""
+        MuseumCatalog._reload_callbacks.append(callback)
+
+    @staticmethod
+    def enable_hot_reload():
+        """Подписывает каталог на уведомления об изменении музеев (до запуска DbNotificationListener)."""
+        MuseumCatalog._reloader = BackgroundReloader("MuseumCatalog", MuseumCatalog.refresh)
+        DbNotificationListener.subscribe(MUSEUM_CATALOG_CHANNEL, MuseumCatalog._on_notification)
+
+    @staticmethod
+    def _on_notification(payload: Optional[str]):
+        if payload is None or payload == "museum":
+            MuseumCatalog._reloader.request()
+
+    @staticmethod
+    def _get_snapshot() -> _MuseumCatalogSnapshot:
+        if MuseumCatalog._snapshot is None:
+            MuseumCatalog.load()
+        return MuseumCatalog._snapshot
+
+    @staticmethod
+    def get(museum_id: int) -> Optional[MuseumRecord]:
+        """Возвращает запись о музее по ID."""
+        return MuseumCatalog._get_snapshot().by_id.get(int(museum_id))
+
+    @staticmethod
+    def get_many(museum_ids: List[int]) -> List[Dict[str, Any]]:
+        """Возвращает музеи по списку ID в том же порядке (отсутствующие пропускаются)."""
+        by_id = MuseumCatalog._get_snapshot().by_id
+        return [by_id[int(i)].to_dict() for i in museum_ids if int(i) in by_id]
+
+    @staticmethod
+    def records_in_city(city: str) -> Tuple[MuseumRecord, ...]:
+        """Возвращает записи о музеях города."""
+        return MuseumCatalog._get_snapshot().by_city.get(city_key(city), ())
+
+    @staticmethod
+    def all_records() -> List[MuseumRecord]:
+        """Возвращает записи обо всех музеях каталога."""
+        return list(MuseumCatalog._get_snapshot().by_id.values())
+
+    @staticmethod
+    def cities() -> List[str]:
+        """Возвращает названия городов каталога (в исходном написании)."""
+        return [records[0].city for records in MuseumCatalog._get_snapshot().by_city.values()]
+
+    @staticmethod
+    def sample_ids(city: str, limit: int, seed: Optional[int] = None) -> List[int]:
+        """
+        Выбирает случайные ID музеев города без повторов.
+
+        :param city: Город.
+        :param limit: Количество музеев в выборке.
+        :param seed: Необязательное зерно генератора (для воспроизводимой выборки).
+        :return: Список ID (все музеи города, если их не больше limit).
+        """
+        ids = MuseumCatalog._get_snapshot().city_ids.get(city_key(city))
+        if ids is None:
+            return []
+        if limit >= ids.size:
+            return ids.tolist()
+        return np.random.default_rng(seed).choice(ids, size=limit, replace=False).tolist()
+
+    @staticmethod
+    def filter_by_city(city: str, limit: Optional[int] = None, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Фильтрует музеи по городу (без обращения к БД).
+        Если указан limit, выбираются случайные музеи без повторов.
+
+        :param city: Город для фильтрации.
+        :param limit: Опциональный параметр для ограничения количества результатов.
+        :param seed: Необязательное зерно выборки (для воспроизводимых результатов).
+        :return: Список музеев в указанном городе.
+        """
+        if limit is not None and limit > 0:
+            return MuseumCatalog.get_many(MuseumCatalog.sample_ids(city, limit, seed))
+        return [record.to_dict() for record in MuseumCatalog.records_in_city(city)]
@@ -0,0 +1,40 @@
+import threading
+from typing import Callable
+
+from src.utils.logger import log
+
+
+# Выполняет перезагрузку в фоновом потоке. Запросы, пришедшие во время перезагрузки,
+# схлопываются в одну повторную перезагрузку, поэтому параллельно выполняется не больше одной.
+class BackgroundReloader:
+    def __init__(self, name: str, reload_func: Callable[[], None]):
+        """
+        :param name: Имя (для логов и названия потока).
+        :param reload_func: Функция перезагрузки.
+        """
+        self.name = name
+        self.reload_func = reload_func
+        self._lock = threading.Lock()
+        self._pending = False
+        self._running = False
+
+    def request(self):
+        """Запрашивает перезагрузку (не блокирует вызывающий поток)."""
+        with self._lock:
+            self._pending = True
+            if self._running:
+                return
+            self._running = True
+        threading.Thread(target=self._run, name=f"{self.name}-reload", daemon=True).start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+                self._pending = False
+            try:
+                self.reload_func()
+            except Exception as e:
+                log(f"[{self.name}] ошибка фоновой перезагрузки: {e}")
@@ -0,0 +1,34 @@
+import threading
+import time
+
+
+# Ограничитель частоты запросов ("корзина токенов"): не больше rate запросов в секунду
+# в среднем, с допустимым всплеском до burst запросов подряд. Потокобезопасен.
+class RateLimiter:
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: Допустимое количество запросов в секунду (0 или меньше - без ограничения).
+        :param burst: Сколько запросов можно выполнить подряд без ожидания.
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Резервирует токен и возвращает время (сек.), которое нужно подождать перед запросом."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        """Блокирует вызывающий поток, пока запрос не будет разрешен."""
+        if self.rate <= 0:
+            return
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
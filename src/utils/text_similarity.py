@@ -0,0 +1,21 @@
+def levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Расстояние Левенштейна с отсечением: если оно больше max_distance, возвращается max_distance + 1
+    (без вычисления точного значения).
+
+    :param a: Первая строка.
+    :param b: Вторая строка.
+    :param max_distance: Наибольшее интересующее расстояние.
+    :return: Расстояние или max_distance + 1.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]